@@ -1,9 +1,35 @@
-import pygame
-from queue import PriorityQueue
-from gridsquare import GridSquare
+import time
+from indexedheap import IndexedHeap
+from costs import CostModel, OCTILE
+from grid import Grid, OPEN, CLOSED, PATH
 
 
-def astar_search(draw, grid: list[list[GridSquare]], start: GridSquare, goal: GridSquare):
+class SearchStats():
+    """
+    What one search did: cells expanded, entries pushed onto the
+    frontier, the largest the frontier grew, the number of steps
+    in the path found and its cost, and the seconds taken.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.pushed = 0
+        self.frontier_peak = 0
+        self.path_length = None
+        self.cost = None
+        self.seconds = 0.0
+        self.started = time.perf_counter()
+
+    def finish(self, path, cost=None):
+        """
+        Records the path found, its cost and the total time.
+        """
+        self.seconds = time.perf_counter() - self.started
+        self.path_length = None if path is None else len(path) - 1
+        self.cost = cost
+
+
+def astar_search(grid: Grid, start: int, goal: int, on_event=None, model: CostModel = OCTILE) -> tuple:
     """
     A* search algorithm.
 
@@ -15,81 +41,86 @@ def astar_search(draw, grid: list[list[GridSquare]], start: GridSquare, goal: Gr
     estimate of the remaining distance (h). This can be expressed 
     as f(n) = g(n) + h(n)
 
+    The cost model decides the moves allowed, their costs and the
+    heuristic h, which is admissible for it, so the path is a
+    shortest one. The default is 8-connected with diagonal steps
+    costing sqrt(2), passing corners as Grid.neighbours allows.
+
+    Needs no display: returns (path, stats), where path is the
+    list of cell indices from start to goal, or None if the goal
+    cannot be reached. If on_event is given it is called as
+    on_event(state, index) when a cell is opened, closed or
+    marked on the path, so a caller can animate the search.
+
     See for summary of variables https://youtu.be/JtiK0DOeI4A?t=5075
     """
+    stats = SearchStats()
+    grid.ensure_masks(model.corners)
+    masks, steps, step_costs, h = grid.masks, grid.steps, model.step_costs, model.heuristic
+
     count = 0
-    g_score = {square: float("inf") for row in grid for square in row}
-    g_score[start] = 0
-    f_score = {square: float("inf") for row in grid for square in row}
-    f_score[start] = h(start.get_position(), goal.get_position())
+    # Scores and parents are only kept for cells the search reaches
+    g_score = {start: 0}
+    came_from = {}
+    closed = set()
+    goal_position = grid.position(goal)
 
-    frontier = PriorityQueue()
-    frontier.put((0, count, start))
+    frontier = IndexedHeap()
+    frontier.push(start, (h(grid.position(start), goal_position), count))
 
     while not frontier.empty():
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
+        current_node, _ = frontier.pop()
+        closed.add(current_node)
+        stats.expanded += 1
 
-        current_node = frontier.get()[2]
-        
         if current_node == goal:
-            reconstruct_path(current_node, draw)
-            goal.make_end()
-            return True
-        
-        for neighbour in current_node.neighbours:
-            temp_g_score = g_score[current_node] + 1
-
-            if temp_g_score < g_score[neighbour]:
-                neighbour.came_from_square = current_node
+            path = reconstruct_path(came_from, current_node)
+            if on_event:
+                for square in path[1:-1]:
+                    on_event(PATH, square)
+            stats.finish(path, g_score[goal])
+            return path, stats
+
+        mask = masks[current_node] & model.moves
+        for direction, step in enumerate(steps):
+            if not mask >> direction & 1:
+                continue
+            neighbour = current_node + step
+            # The heuristic is consistent, so a closed cell is never improved
+            if neighbour in closed:
+                continue
+            temp_g_score = g_score[current_node] + step_costs[direction]
+
+            if temp_g_score < g_score.get(neighbour, float("inf")):
+                came_from[neighbour] = current_node
                 g_score[neighbour] = temp_g_score
-                f_score[neighbour] = temp_g_score + h(neighbour.get_position(), goal.get_position())
+                f_score = temp_g_score + h(grid.position(neighbour), goal_position)
 
-                if neighbour not in frontier.queue:
-                    count += 1
-                    frontier.put((f_score[neighbour], count, neighbour))
-                    neighbour.make_open()
+                # A cell already on the frontier has its f_score lowered in place
+                if neighbour not in frontier:
+                    stats.pushed += 1
+                    if on_event and neighbour != goal:
+                        on_event(OPEN, neighbour)
+                count += 1
+                frontier.push(neighbour, (f_score, count))
 
-        draw()
-
-        if current_node != start:
-            current_node.make_closed()
-
-    return False
-
-
-def h(a, b):
-    """
-    Heuristic function calculating Manhattan distance 
-    from point a to point b grid coordinates.
-
-    See https://youtu.be/alU04hvz6L4?t=504 for more info
-    on straight vs diagonal cost
-
-    Args:
-      a: a tuple of a grid square coordinate for point a, for example (1, 2)
-      b: a tuple of a grid square coordinate for point b, for example (6, 6)
-    Returns:
-      h_cost: the estimated distance from point a to point b, for example (3, 3)
-      
-    """
-    a_x, a_y = a
-    b_x, b_y = b
+        stats.frontier_peak = max(stats.frontier_peak, len(frontier))
+        if on_event and current_node != start:
+            on_event(CLOSED, current_node)
 
-    x_distance = abs(a_x - b_x)
-    y_distance = abs(a_y - b_y)
-    
-    return x_distance + y_distance
+    stats.finish(None)
+    return None, stats
 
 
-def reconstruct_path(current_node: GridSquare, draw):
+def reconstruct_path(came_from: dict, current_node: int) -> list:
     """
-    Traverses the travelled path and reconstructs 
-    the optimal path from the current node using 
-    it's came_from_square 
+    Traverses the travelled path back from the current
+    node using the square each cell was reached from,
+    and returns it in order from the start
     """
-    while current_node.came_from_square != None:
-        current_node = current_node.came_from_square
-        current_node.make_path()
-        draw()
+    path = [current_node]
+    while current_node in came_from:
+        current_node = came_from[current_node]
+        path.append(current_node)
+    path.reverse()
+    return path
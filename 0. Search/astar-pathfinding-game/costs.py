@@ -0,0 +1,83 @@
+import math
+
+SQRT2 = math.sqrt(2)
+
+# When a diagonal move may pass the corner of a barrier: always, unless
+# both cells beside the move are barriers, or only if neither is
+CUT_CORNERS, NO_SQUEEZE, NO_CORNERS = "cut corners", "no squeeze", "no corners"
+
+# Grid.neighbour_masks bits of the straight and the diagonal moves
+STRAIGHT = 0b00001111
+DIAGONAL = 0b11110000
+
+
+def manhattan(a, b):
+    """
+    Heuristic function calculating Manhattan distance
+    from point a to point b grid coordinates.
+
+    See https://youtu.be/alU04hvz6L4?t=504 for more info
+    on straight vs diagonal cost
+
+    Args:
+      a: a tuple of a grid square coordinate for point a, for example (1, 2)
+      b: a tuple of a grid square coordinate for point b, for example (6, 6)
+    Returns:
+      h_cost: the estimated distance from point a to point b, for example (3, 3)
+
+    """
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def octile(a, b):
+    """
+    Length of the shortest 8-connected route from point a to
+    point b with no barriers: diagonal steps cost sqrt(2).
+    """
+    row_distance = abs(a[0] - b[0])
+    column_distance = abs(a[1] - b[1])
+    return max(row_distance, column_distance) + (SQRT2 - 1) * min(row_distance, column_distance)
+
+
+def chebyshev(a, b):
+    """
+    Length of the shortest 8-connected route from point a to
+    point b with no barriers when every step costs 1.
+    """
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+class CostModel():
+    """
+    Which moves a search may make, what they cost and the matching
+    heuristic. Each heuristic is the exact cost on a grid without
+    barriers, so it never overestimates and A* paths are shortest.
+
+    step_costs is indexed like grid.OFFSETS: four straight moves, then
+    four diagonal ones, and moves is the mask of the allowed ones.
+    """
+
+    def __init__(self, name: str, moves: int, diagonal_cost: float, heuristic, corners: str = CUT_CORNERS):
+        self.name = name
+        self.moves = moves
+        self.diagonal_cost = diagonal_cost
+        self.heuristic = heuristic
+        self.corners = corners
+        self.step_costs = [1] * 4 + [diagonal_cost] * 4
+
+    def __repr__(self):
+        return f"CostModel({self.name}, {self.corners})"
+
+    def with_corners(self, corners: str) -> "CostModel":
+        """
+        The same model with another rule for diagonal moves past corners.
+        """
+        return CostModel(self.name, self.moves, self.diagonal_cost, self.heuristic, corners)
+
+
+MANHATTAN = CostModel("4-connected Manhattan", STRAIGHT, None, manhattan)
+OCTILE = CostModel("8-connected octile", STRAIGHT | DIAGONAL, SQRT2, octile)
+CHEBYSHEV = CostModel("8-connected Chebyshev", STRAIGHT | DIAGONAL, 1, chebyshev)
+
+# Models the game cycles through, the default first
+MODELS = [OCTILE, CHEBYSHEV, MANHATTAN]
@@ -1,78 +1,116 @@
+import sys
+import time
 import pygame
-from gridsquare import GridSquare
+from grid import Grid, PALETTE, FREE, BARRIER, START, END
 from colors import colors
 from astar import astar_search
+from jps import jump_point_search
+from hpa import HierarchicalSearch
+from costs import MODELS, CUT_CORNERS, NO_SQUEEZE, NO_CORNERS
 
 WIDTH = 800
+ROWS = 50
+# Most frames per second drawn while animating a search
+FPS = 60
+# Search run by each key, HPA* keeping its graph between searches
+SEARCHES = {
+    pygame.K_SPACE: astar_search,
+    pygame.K_j: jump_point_search,
+    pygame.K_h: HierarchicalSearch()
+}
+# Rules for diagonal moves past barriers, cycled with the 'n' key
+CORNER_RULES = [CUT_CORNERS, NO_SQUEEZE, NO_CORNERS]
 WINDOW = pygame.display.set_mode((WIDTH, WIDTH))
 pygame.display.set_caption("A* Path Finding Algorithm")
 
 
-def make_grid(rows: int, width: float) -> list[list[GridSquare]]:
+def make_grid(rows: int, width: float) -> Grid:
     """
-    Creates the game grid as a 2D array of 
-    GridSquare objects.
+    Creates the game grid as a rows x rows
+    Grid of free cells.
     """
-    grid = []
-    gap = width // rows
-    for i in range(rows):
-        grid.append([])
-        for j in range(rows):
-            square = GridSquare(row=i, 
-                                column=j,
-                                width=gap,
-                                total_rows=rows)
-            grid[i].append(square)
-    
-    return grid
+    return Grid(rows)
 
 
 def draw_gridlines(window, rows, width):
     """
     For every row draw an horizontal line 
     and vertical line on the grid.
+    Skipped once squares are too small to see them.
     """
     gap = width // rows
+    if gap < 4:
+        return
     for i in range(rows):
         pygame.draw.line(window, colors["GRAY"], (0, i * gap), (width, i * gap))
-        for j in range(rows):
-            pygame.draw.line(window, colors["GRAY"], (j * gap, 0), (j * gap, width))
+        pygame.draw.line(window, colors["GRAY"], (i * gap, 0), (i * gap, width))
 
 
 def draw(window, grid, rows, width):
     """
-    Draw the grid at every frame. Paints the 
-    canvas white then redraws the grid squares
-    with their current state and the gridlines
+    Draw the grid at every frame. Colours every
+    cell from its state in one array operation,
+    scales the image to the window then draws
+    the gridlines
     """
-    window.fill(colors["WHITE"])
-
-    for row in grid:
-        for square in row:
-            square.draw(window)
+    # The first surface axis is x, which is the grid's row axis
+    surface = pygame.surfarray.make_surface(PALETTE[grid.states()])
+    window.blit(pygame.transform.scale(surface, (width, width)), (0, 0))
 
     draw_gridlines(window, rows, width)
     pygame.display.update()
 
 
+class SearchAnimation():
+    """
+    Receives the events of a search, paints them onto the grid
+    and redraws at most fps times a second, so the search runs
+    at full speed however many cells change between frames.
+    """
+
+    def __init__(self, window, grid, rows, width, fps=FPS):
+        self.window = window
+        self.grid = grid
+        self.rows = rows
+        self.width = width
+        self.frame_time = 1 / fps
+        self.next_frame = 0.0
+
+    def __call__(self, state, index):
+        if self.grid.get(index) not in (START, END):
+            self.grid.set(index, state)
+        now = time.perf_counter()
+        if now >= self.next_frame:
+            self.next_frame = now + self.frame_time
+            self.draw()
+
+    def draw(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        draw(self.window, self.grid, self.rows, self.width)
+
+
 def get_clicked_square(position, rows, width):
     """
     Determines what grid square was clicked on
     """
-    gap = width // rows
     y, x = position
 
-    row = y // gap
-    column = x // gap
+    row = min(y * rows // width, rows - 1)
+    column = min(x * rows // width, rows - 1)
 
     return row, column
         
 
 def main(window, width):
-    rows = 50
+    rows = ROWS
     grid = make_grid(rows, width)
-    start: GridSquare = None
-    end: GridSquare = None
+    start: int = None
+    end: int = None
+    model_number = 0
+    corners = CUT_CORNERS
     game_is_running = True
     search_algorithm_is_running = False
 
@@ -89,20 +127,20 @@ def main(window, width):
             if pygame.mouse.get_pressed()[0]:
                 mouse_position = pygame.mouse.get_pos()
                 row, column = get_clicked_square(mouse_position, rows, width)
-                square: GridSquare = grid[row][column]
-                if not start and square != end:
+                square = grid.index(row, column)
+                if start is None and square != end:
                     start = square
-                    start.make_start()
-                elif not end and square != start:
+                    grid.set(start, START)
+                elif end is None and square != start:
                     end = square
-                    end.make_end()
+                    grid.set(end, END)
                 elif square != end and square != start:
-                    square.make_barrier()
+                    grid.set(square, BARRIER)
             elif pygame.mouse.get_pressed()[2]:
                 mouse_position = pygame.mouse.get_pos()
                 row, column = get_clicked_square(mouse_position, rows, width)
-                square: GridSquare = grid[row][column]
-                square.reset()
+                square = grid.index(row, column)
+                grid.set(square, FREE)
                 if square == start:
                     start = None
                 
@@ -110,12 +148,27 @@ def main(window, width):
                     end = None
 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    for row in grid:
-                        for square in row:
-                            square.update_neighbours(grid)
-
-                    astar_search(lambda: draw(window, grid, rows, width), grid, start, end)
+                if event.key in SEARCHES and start is not None and end is not None:
+                    grid.clear_search()
+                    animation = SearchAnimation(window, grid, rows, width)
+                    model = MODELS[model_number].with_corners(corners)
+                    try:
+                        path, stats = SEARCHES[event.key](grid, start, end, animation, model)
+                    except ValueError as error:
+                        print(error)
+                        continue
+                    animation.draw()
+                    print(f"Path of {stats.path_length} steps costing {stats.cost:.2f}, "
+                          f"{stats.expanded} squares expanded in {stats.seconds:.3f} seconds"
+                          if path else "No path found")
+
+                if event.key == pygame.K_m:
+                    model_number = (model_number + 1) % len(MODELS)
+                    print(f"Costs: {MODELS[model_number].name}")
+
+                if event.key == pygame.K_n:
+                    corners = CORNER_RULES[(CORNER_RULES.index(corners) + 1) % len(CORNER_RULES)]
+                    print(f"Diagonal moves: {corners}")
 
                 if event.key == pygame.K_c:
                     start = None
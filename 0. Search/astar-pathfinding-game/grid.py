@@ -0,0 +1,136 @@
+import numpy as np
+from colors import colors
+from costs import CUT_CORNERS, NO_SQUEEZE, NO_CORNERS
+
+# Cell states, stored one byte per cell
+FREE, BARRIER, OPEN, CLOSED, START, END, PATH = range(7)
+
+# Colour drawn for each cell state, indexed by state
+PALETTE = np.array([
+    colors["WHITE"],
+    colors["BLACK"],
+    colors["GREEN"],
+    colors["RED"],
+    colors["ORANGE"],
+    colors["TURQUOISE"],
+    colors["PURPLE"]
+], dtype=np.uint8)
+
+# (row, column) steps to the 8 neighbours, in the order
+# up, down, right, left, up left, up right, down right, down left
+OFFSETS = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, -1), (-1, 1), (1, 1), (1, -1)]
+
+
+class Grid():
+    """
+    A rows x columns grid of cell states held in a flat NumPy array.
+
+    Cells are addressed by integer index, row * columns + column, so a
+    search only ever handles ints. Neighbours are not stored per cell:
+    neighbour_masks computes, for every cell at once, a byte whose bit d
+    is set when the step OFFSETS[d] leads to a cell that is not a barrier.
+    """
+
+    def __init__(self, rows: int, columns: int = None):
+        self.rows = rows
+        self.columns = rows if columns is None else columns
+        self.cells = np.zeros(self.rows * self.columns, dtype=np.uint8)
+        self.masks = None
+        self.corners = None
+        # Index step to the neighbour in each direction
+        self.steps = [d_row * self.columns + d_column for d_row, d_column in OFFSETS]
+
+    @classmethod
+    def from_barriers(cls, barriers) -> "Grid":
+        """
+        Builds a grid from a 2D array that is true at barrier cells.
+        """
+        barriers = np.asarray(barriers, dtype=bool)
+        grid = cls(*barriers.shape)
+        grid.cells[barriers.ravel()] = BARRIER
+        return grid
+
+    def __len__(self):
+        return self.rows * self.columns
+
+    def index(self, row: int, column: int) -> int:
+        return row * self.columns + column
+
+    def position(self, index: int) -> tuple:
+        return divmod(index, self.columns)
+
+    def states(self) -> np.ndarray:
+        """
+        The cell states as a rows x columns view of the flat array.
+        """
+        return self.cells.reshape(self.rows, self.columns)
+
+    def get(self, index: int) -> int:
+        return int(self.cells[index])
+
+    def set(self, index: int, state: int):
+        # Adding or removing a barrier makes the neighbour masks stale
+        if state == BARRIER or self.cells[index] == BARRIER:
+            self.masks = None
+        self.cells[index] = state
+
+    def is_barrier(self, index: int) -> bool:
+        return self.cells[index] == BARRIER
+
+    def clear_search(self):
+        """
+        Resets open, closed and path cells left by a previous search.
+        """
+        self.cells[np.isin(self.cells, (OPEN, CLOSED, PATH))] = FREE
+
+    def neighbour_masks(self, corners: str = CUT_CORNERS) -> np.ndarray:
+        """
+        Computes and keeps the neighbour bitmask of every cell,
+        with whole-array shifts rather than a loop over cells.
+        corners is the costs rule for diagonal moves past barriers.
+        """
+        passable = self.states() != BARRIER
+        masks = np.zeros((self.rows, self.columns), dtype=np.uint8)
+        for direction, (d_row, d_column) in enumerate(OFFSETS):
+            # The part of the grid whose neighbour in this direction is inside it
+            rows = slice(max(0, -d_row), self.rows - max(0, d_row))
+            columns = slice(max(0, -d_column), self.columns - max(0, d_column))
+            moved_rows = slice(rows.start + d_row, rows.stop + d_row)
+            moved_columns = slice(columns.start + d_column, columns.stop + d_column)
+            masks[rows, columns] |= passable[moved_rows, moved_columns].astype(np.uint8) << direction
+
+        if corners != CUT_CORNERS:
+            for direction, (d_row, d_column) in enumerate(OFFSETS):
+                if not (d_row and d_column):
+                    continue
+                # The straight moves either side of this diagonal one
+                beside_row = masks >> OFFSETS.index((d_row, 0)) & 1
+                beside_column = masks >> OFFSETS.index((0, d_column)) & 1
+                if corners == NO_CORNERS:
+                    allowed = beside_row & beside_column
+                elif corners == NO_SQUEEZE:
+                    allowed = beside_row | beside_column
+                else:
+                    raise ValueError(f"Unknown corner rule {corners}")
+                masks[allowed == 0] &= ~np.uint8(1 << direction)
+
+        self.masks = masks.ravel().tolist()
+        self.corners = corners
+        return masks
+
+    def ensure_masks(self, corners: str = CUT_CORNERS):
+        """
+        Computes the neighbour masks unless they are current for corners.
+        """
+        if self.masks is None or self.corners != corners:
+            self.neighbour_masks(corners)
+
+    def neighbours(self, index: int, moves: int = 0xFF) -> list:
+        """
+        Indices of the passable neighbours of a cell, from the masks
+        computed by the last call to neighbour_masks, which must
+        have been made since barriers last changed. moves masks the
+        directions considered, as in CostModel.moves.
+        """
+        mask = self.masks[index] & moves
+        return [index + step for direction, step in enumerate(self.steps) if mask >> direction & 1]
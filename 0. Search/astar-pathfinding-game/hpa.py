@@ -0,0 +1,427 @@
+import heapq
+import numpy as np
+from astar import SearchStats
+from costs import CostModel, OCTILE, CUT_CORNERS, DIAGONAL
+from grid import Grid, OFFSETS, BARRIER, OPEN, CLOSED, PATH
+
+# Side of the square clusters the grid is cut into
+CLUSTER_SIZE = 16
+
+# Entrances at least this wide get a transition at each end, narrower
+# ones a single transition in the middle
+WIDE_ENTRANCE = 6
+
+INFINITY = float("inf")
+
+
+class HierarchicalGraph():
+    """
+    Hierarchical path-finding A* (HPA*) abstraction of a grid.
+
+    The grid is cut into cluster_size x cluster_size clusters. Wherever
+    a border between two clusters has a run of free cells on both sides
+    (an entrance), one or two pairs of facing cells become nodes of an
+    abstract graph, joined by a straight step. Within each cluster the
+    nodes are joined by edges costing their shortest distance inside
+    the cluster, found once when the graph is built.
+
+    A query links the start and goal to the nodes of their clusters,
+    searches the much smaller abstract graph, then refines each
+    abstract edge into cells with a search confined to one cluster.
+    Routes only change cluster through transitions, so a path may be
+    slightly longer than the true shortest one, typically by a few percent.
+
+    The graph describes the barriers when it was built or last updated;
+    call update after changing them.
+
+    See https://webdocs.cs.ualberta.ca/~mmueller/ps/hpastar.pdf
+    """
+
+    def __init__(self, grid: Grid, cluster_size: int = CLUSTER_SIZE, model: CostModel = OCTILE):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.model = model
+        self.clusters_across = -(-grid.columns // cluster_size)
+        grid.ensure_masks(model.corners)
+        # Kept so other searches on the grid cannot swap them for another corner rule
+        self.masks = grid.masks
+
+        # Barriers the graph describes, to find the cells edited since
+        self.passable = grid.cells != BARRIER
+
+        rows, columns = np.divmod(np.arange(len(grid)), grid.columns)
+        self.cluster_of = (rows // cluster_size) * self.clusters_across + columns // cluster_size
+
+        # Abstract edges: node -> {neighbouring node: cost}
+        self.edges = {}
+        # Nodes of each cluster: cluster -> list of nodes
+        self.cluster_nodes = {}
+        # Cells of refined intra-cluster edges, filled in as queries need them
+        self.paths = {}
+
+        self.add_transitions()
+        for cluster, nodes in self.cluster_nodes.items():
+            self.connect_cluster(cluster, nodes)
+
+    def add_transitions(self, clusters: set = None):
+        """
+        Finds the entrances along every border between two clusters and
+        adds a node on each side of their transitions. Given a set of
+        clusters, only the transitions into or out of them are added.
+        """
+        grid, size = self.grid, self.cluster_size
+        passable = grid.states() != BARRIER
+        squeezes = self.model.moves & DIAGONAL and self.model.corners == CUT_CORNERS
+        if clusters is not None:
+            cluster_rows = {cluster // self.clusters_across for cluster in clusters}
+            cluster_columns = {cluster % self.clusters_across for cluster in clusters}
+
+        # Borders between horizontally adjacent clusters, then vertically
+        borders = []
+        for column in range(size, grid.columns, size):
+            if clusters is None or {column // size - 1, column // size} & cluster_columns:
+                borders.append((passable[:, column - 1], passable[:, column],
+                                lambda row, column=column: (grid.index(row, column - 1), grid.index(row, column))))
+        for row in range(size, grid.rows, size):
+            if clusters is None or {row // size - 1, row // size} & cluster_rows:
+                borders.append((passable[row - 1, :], passable[row, :],
+                                lambda column, row=row: (grid.index(row - 1, column), grid.index(row, column))))
+
+        for side_a, side_b, cells_at in borders:
+            self.add_entrances(side_a & side_b, cells_at, clusters)
+            if squeezes:
+                self.add_squeezes(side_a, side_b, cells_at, clusters)
+
+    def add_entrances(self, open_cells: np.ndarray, cells_at, clusters: set = None):
+        """
+        Adds transitions for the runs of True in open_cells along one
+        border, which cells_at maps to the facing pair of cell indices.
+        Runs are also split where the border crosses into new clusters.
+        """
+        size = self.cluster_size
+        run_start = None
+        for offset, is_open in enumerate(open_cells.tolist() + [False]):
+            if run_start is not None and (not is_open or offset % size == 0):
+                length = offset - run_start
+                if length >= WIDE_ENTRANCE:
+                    offsets = [run_start, offset - 1]
+                else:
+                    offsets = [run_start + length // 2]
+                for transition in offsets:
+                    self.add_transition(*cells_at(transition), self.model.step_costs[0], clusters)
+                run_start = None
+            if is_open and run_start is None:
+                run_start = offset
+
+    def add_squeezes(self, side_a: np.ndarray, side_b: np.ndarray, cells_at, clusters: set = None):
+        """
+        Adds a diagonal transition wherever the border can only be
+        crossed by squeezing diagonally between two barriers, which no
+        straight entrance nearby would stand in for.
+        """
+        diagonal_cost = self.model.diagonal_cost
+        # From side a at offset i to side b at i + 1, then at i - 1
+        down = side_a[:-1] & side_b[1:] & ~side_b[:-1] & ~side_a[1:]
+        for offset in np.flatnonzero(down).tolist():
+            self.add_transition(cells_at(offset)[0], cells_at(offset + 1)[1], diagonal_cost, clusters)
+        up = side_a[1:] & side_b[:-1] & ~side_b[1:] & ~side_a[:-1]
+        for offset in np.flatnonzero(up).tolist():
+            self.add_transition(cells_at(offset + 1)[0], cells_at(offset)[1], diagonal_cost, clusters)
+
+    def add_transition(self, a: int, b: int, cost: float, clusters: set = None):
+        if clusters is None or self.cluster_of[a] in clusters or self.cluster_of[b] in clusters:
+            self.add_edge(a, b, cost)
+
+    def add_node(self, node: int):
+        if node not in self.edges:
+            self.edges[node] = {}
+            self.cluster_nodes.setdefault(int(self.cluster_of[node]), []).append(node)
+
+    def add_edge(self, a: int, b: int, cost: float):
+        self.add_node(a)
+        self.add_node(b)
+        if cost < self.edges[a].get(b, INFINITY):
+            self.edges[a][b] = self.edges[b][a] = cost
+
+    def connect_cluster(self, cluster: int, nodes: list):
+        """
+        Joins every pair of nodes in a cluster that can reach each other
+        inside it by an edge costing their distance.
+        """
+        cells = self.cluster_cells(cluster)
+        for number, node in enumerate(nodes):
+            targets = set(nodes[number + 1:])
+            if not targets:
+                break
+            self.connect_node(node, cluster, targets, cells)
+
+    def connect_node(self, node: int, cluster: int, targets: set, cells: set = None):
+        """
+        Joins a node to each of the targets in its cluster it can reach.
+        """
+        g_score, _ = self.search_cluster(node, cluster, targets, cells)
+        for target in targets:
+            if target in g_score and target != node:
+                self.add_edge(node, target, g_score[target])
+
+    def update(self):
+        """
+        Brings the graph up to date with the barriers on the grid.
+
+        Only the clusters with edited cells are redone: their nodes are
+        dropped along with any node elsewhere left without a transition,
+        the transitions on their borders are found again, and the
+        clusters are reconnected. Nodes that reappear next door are
+        only joined to the other nodes of their own cluster.
+        """
+        passable = self.grid.cells != BARRIER
+        changed = np.flatnonzero(passable != self.passable)
+        if not len(changed):
+            return
+        self.passable = passable
+        self.grid.ensure_masks(self.model.corners)
+        self.masks = self.grid.masks
+        cluster_of = self.cluster_of
+        dirty = set(np.unique(cluster_of[changed]).tolist())
+        if self.model.moves & DIAGONAL and self.model.corners == CUT_CORNERS:
+            # A squeeze across the corner where four clusters meet joins two
+            # of them and depends on cells of the other two, so an edit next
+            # to such a corner affects all the clusters around it
+            grid, size = self.grid, self.cluster_size
+            for cell in changed.tolist():
+                row, column = grid.position(cell)
+                for d_row, d_column in OFFSETS[4:]:
+                    across_row, across_column = row + d_row, column + d_column
+                    if (0 <= across_row < grid.rows and 0 <= across_column < grid.columns
+                            and across_row // size != row // size and across_column // size != column // size):
+                        dirty.add(int(cluster_of[grid.index(across_row, column)]))
+                        dirty.add(int(cluster_of[grid.index(row, across_column)]))
+                        dirty.add(int(cluster_of[grid.index(across_row, across_column)]))
+
+        # Nodes of other clusters that lost a transition into a dirty one
+        neighbours = set()
+        for cluster in dirty:
+            for node in self.cluster_nodes.pop(cluster, []):
+                for neighbour in self.edges.pop(node):
+                    if cluster_of[neighbour] not in dirty:
+                        del self.edges[neighbour][node]
+                        neighbours.add(neighbour)
+        for node in neighbours:
+            cluster = int(cluster_of[node])
+            if all(cluster_of[neighbour] == cluster for neighbour in self.edges[node]):
+                for neighbour in self.edges.pop(node):
+                    del self.edges[neighbour][node]
+                self.cluster_nodes[cluster].remove(node)
+
+        old_nodes = set(self.edges)
+        self.add_transitions(dirty)
+        for cluster in dirty:
+            self.connect_cluster(cluster, self.cluster_nodes.get(cluster, []))
+        for node in self.edges.keys() - old_nodes:
+            cluster = int(cluster_of[node])
+            if cluster not in dirty:
+                self.connect_node(node, cluster, set(self.cluster_nodes[cluster]))
+
+        self.paths = {
+            (a, b): cells for (a, b), cells in self.paths.items()
+            if a in self.edges and b in self.edges and cluster_of[a] not in dirty
+        }
+
+    def search_cluster(self, source: int, cluster: int, targets: set, cells: set = None) -> tuple:
+        """
+        Dijkstra's algorithm from source over the cells of one cluster,
+        stopping once every reachable target is settled. cells is the
+        cluster's cluster_cells, if the caller already has them.
+        Returns (g_score, came_from).
+
+        Searches here and in find_path use heapq, skipping stale
+        entries, as it is faster than the IndexedHeap in pure Python.
+        """
+        masks, steps = self.masks, self.grid.steps
+        moves, step_costs = self.model.moves, self.model.step_costs
+        if cells is None:
+            cells = self.cluster_cells(cluster)
+        directions = list(enumerate(steps))
+        remaining = set(targets)
+        remaining.discard(source)
+        g_score = {source: 0}
+        came_from = {}
+        closed = set()
+
+        frontier = [(0, source)]
+        while remaining and frontier:
+            current_g, current_node = heapq.heappop(frontier)
+            if current_node in closed:
+                continue
+            closed.add(current_node)
+            remaining.discard(current_node)
+
+            mask = masks[current_node] & moves
+            for direction, step in directions:
+                if not mask >> direction & 1:
+                    continue
+                neighbour = current_node + step
+                if neighbour in closed or neighbour not in cells:
+                    continue
+                temp_g_score = current_g + step_costs[direction]
+                if temp_g_score < g_score.get(neighbour, INFINITY):
+                    g_score[neighbour] = temp_g_score
+                    came_from[neighbour] = current_node
+                    heapq.heappush(frontier, (temp_g_score, neighbour))
+
+        return g_score, came_from
+
+    def cluster_cells(self, cluster: int) -> set:
+        """
+        Indices of the cells of a cluster, as a set for fast membership
+        tests in the searches confined to it.
+        """
+        grid, size = self.grid, self.cluster_size
+        top, left = divmod(cluster, self.clusters_across)
+        top, left = top * size, left * size
+        return {
+            row * grid.columns + column
+            for row in range(top, min(top + size, grid.rows))
+            for column in range(left, min(left + size, grid.columns))
+        }
+
+    def local_links(self, cell: int) -> dict:
+        """
+        Distances inside its cluster from a cell to the cluster's nodes.
+        """
+        cluster = int(self.cluster_of[cell])
+        nodes = self.cluster_nodes.get(cluster, [])
+        g_score, _ = self.search_cluster(cell, cluster, set(nodes))
+        return {node: g_score[node] for node in nodes if node in g_score and node != cell}
+
+    def find_path(self, start: int, goal: int, on_event=None) -> tuple:
+        """
+        Same contract as astar_search: returns (path, stats), path being
+        every cell from start to goal or None, and reports the abstract
+        nodes opened and closed and the cells on the path as events.
+        """
+        stats = SearchStats()
+        grid, h = self.grid, self.model.heuristic
+        if start == goal:
+            stats.finish([start], 0)
+            return [start], stats
+
+        # Temporary edges out of the start and into the goal
+        start_edges = dict(self.edges.get(start, {}))
+        for node, cost in self.local_links(start).items():
+            start_edges[node] = min(cost, start_edges.get(node, INFINITY))
+        goal_edges = self.local_links(goal)
+        if self.cluster_of[start] == self.cluster_of[goal]:
+            g_score, _ = self.search_cluster(start, self.cluster_of[start], {goal})
+            if goal in g_score:
+                start_edges[goal] = g_score[goal]
+
+        count = 0
+        goal_position = grid.position(goal)
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        frontier = [(h(grid.position(start), goal_position), count, start)]
+
+        while frontier:
+            current_node = heapq.heappop(frontier)[2]
+            if current_node in closed:
+                continue
+            closed.add(current_node)
+            stats.expanded += 1
+
+            if current_node == goal:
+                path = self.refine(reconstruct_nodes(came_from, goal))
+                if on_event:
+                    for square in path[1:-1]:
+                        on_event(PATH, square)
+                stats.finish(path, g_score[goal])
+                return path, stats
+
+            edges = start_edges if current_node == start else self.edges.get(current_node, {})
+            links = list(edges.items())
+            if current_node in goal_edges:
+                links.append((goal, goal_edges[current_node]))
+            for neighbour, cost in links:
+                if neighbour in closed:
+                    continue
+                temp_g_score = g_score[current_node] + cost
+                if temp_g_score < g_score.get(neighbour, INFINITY):
+                    came_from[neighbour] = current_node
+                    f_score = temp_g_score + h(grid.position(neighbour), goal_position)
+                    if neighbour not in g_score:
+                        stats.pushed += 1
+                        if on_event and neighbour != goal:
+                            on_event(OPEN, neighbour)
+                    g_score[neighbour] = temp_g_score
+                    count += 1
+                    heapq.heappush(frontier, (f_score, count, neighbour))
+
+            stats.frontier_peak = max(stats.frontier_peak, len(frontier))
+            if on_event and current_node != start:
+                on_event(CLOSED, current_node)
+
+        stats.finish(None)
+        return None, stats
+
+    def refine(self, nodes: list) -> list:
+        """
+        Expands a route of abstract nodes into every cell along it.
+        Consecutive nodes in different clusters are a transition, one
+        step apart; others are joined by a search inside their cluster.
+        """
+        path = nodes[:1]
+        for a, b in zip(nodes, nodes[1:]):
+            if self.cluster_of[a] != self.cluster_of[b]:
+                path.append(b)
+                continue
+            cells = self.paths.get((a, b))
+            if cells is None:
+                _, came_from = self.search_cluster(a, self.cluster_of[a], {b})
+                cells = reconstruct_nodes(came_from, b)[1:]
+                # Only edges between permanent nodes are worth keeping
+                if a in self.edges and b in self.edges:
+                    self.paths[(a, b)] = cells
+            path.extend(cells)
+        return path
+
+
+def reconstruct_nodes(came_from: dict, current_node: int) -> list:
+    """
+    The nodes from the start of a search to the current node.
+    """
+    nodes = [current_node]
+    while current_node in came_from:
+        current_node = came_from[current_node]
+        nodes.append(current_node)
+    nodes.reverse()
+    return nodes
+
+
+def hierarchical_search(grid: Grid, start: int, goal: int, on_event=None, model: CostModel = OCTILE) -> tuple:
+    """
+    Builds a HierarchicalGraph of the grid and answers one query with it.
+    For many queries on the same map, build the graph once instead.
+    """
+    return HierarchicalGraph(grid, model=model).find_path(start, goal, on_event)
+
+
+class HierarchicalSearch():
+    """
+    A search with the same signature as hierarchical_search that keeps
+    its HierarchicalGraph between calls. The graph is only built again
+    for another grid or cost model; otherwise it is updated for any
+    barriers edited since the last call.
+    """
+
+    def __init__(self):
+        self.graph = None
+
+    def __call__(self, grid: Grid, start: int, goal: int, on_event=None, model: CostModel = OCTILE) -> tuple:
+        graph = self.graph
+        if (graph is None or graph.grid is not grid or graph.model.name != model.name
+                or graph.model.corners != model.corners):
+            self.graph = graph = HierarchicalGraph(grid, model=model)
+        else:
+            graph.update()
+        return graph.find_path(start, goal, on_event)
@@ -0,0 +1,87 @@
+class IndexedHeap():
+    """
+    A binary min-heap of items with priorities that also records where
+    each item sits in the heap.
+
+    Knowing an item's position gives O(1) membership tests and lets a
+    priority be lowered in place (decrease-key) in O(log n), so an item
+    is never in the heap twice. Priorities are compared with <, so
+    tuples such as (f_score, count) break ties.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.priorities = []
+        self.position = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def empty(self) -> bool:
+        return not self.items
+
+    def priority(self, item):
+        return self.priorities[self.position[item]]
+
+    def push(self, item, priority):
+        """
+        Adds item, or lowers its priority if it is already in the heap.
+        An existing item keeps its priority if the new one is not lower.
+        """
+        index = self.position.get(item)
+        if index is None:
+            self.items.append(item)
+            self.priorities.append(priority)
+            self.position[item] = len(self.items) - 1
+            self.sift_up(len(self.items) - 1)
+        elif priority < self.priorities[index]:
+            self.priorities[index] = priority
+            self.sift_up(index)
+
+    def pop(self) -> tuple:
+        """
+        Removes and returns (item, priority) with the lowest priority.
+        """
+        items, priorities = self.items, self.priorities
+        item, priority = items[0], priorities[0]
+        del self.position[item]
+        last_item, last_priority = items.pop(), priorities.pop()
+        if items:
+            items[0], priorities[0] = last_item, last_priority
+            self.position[last_item] = 0
+            self.sift_down(0)
+        return item, priority
+
+    def sift_up(self, index: int):
+        items, priorities, position = self.items, self.priorities, self.position
+        item, priority = items[index], priorities[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not priority < priorities[parent]:
+                break
+            items[index], priorities[index] = items[parent], priorities[parent]
+            position[items[index]] = index
+            index = parent
+        items[index], priorities[index] = item, priority
+        position[item] = index
+
+    def sift_down(self, index: int):
+        items, priorities, position = self.items, self.priorities, self.position
+        item, priority = items[index], priorities[index]
+        size = len(items)
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and priorities[child + 1] < priorities[child]:
+                child += 1
+            if not priorities[child] < priority:
+                break
+            items[index], priorities[index] = items[child], priorities[child]
+            position[items[index]] = index
+            index = child
+        items[index], priorities[index] = item, priority
+        position[item] = index
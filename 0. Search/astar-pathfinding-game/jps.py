@@ -0,0 +1,193 @@
+from astar import SearchStats
+from costs import CostModel, OCTILE, CUT_CORNERS, SQRT2, octile
+from grid import Grid, OFFSETS, OPEN, CLOSED, PATH
+from indexedheap import IndexedHeap
+
+# Mask bit of each (row, column) step, see Grid.neighbour_masks
+BIT = {offset: 1 << direction for direction, offset in enumerate(OFFSETS)}
+
+
+def forced_checks(d_row: int, d_column: int) -> list:
+    """
+    The (neighbour, obstacle) pairs that make a cell reached by moving
+    in direction (d_row, d_column) a jump point: the neighbour is forced
+    when it is free but the obstacle cell next to it is a barrier.
+    """
+    if d_row and d_column:
+        return [((d_row, -d_column), (0, -d_column)), ((-d_row, d_column), (-d_row, 0))]
+    if d_column:
+        return [((1, d_column), (1, 0)), ((-1, d_column), (-1, 0))]
+    return [((d_row, 1), (0, 1)), ((d_row, -1), (0, -1))]
+
+
+# For each direction, the steps always worth following from a jump
+# point reached that way, and its forced checks as mask bits
+NATURAL = {
+    (d_row, d_column): [step for step in [(d_row, 0), (0, d_column), (d_row, d_column)] if step != (0, 0)]
+    for d_row, d_column in OFFSETS
+}
+FORCED = {
+    direction: [(BIT[neighbour], BIT[obstacle], neighbour) for neighbour, obstacle in forced_checks(*direction)]
+    for direction in OFFSETS
+}
+
+
+def jump_point_search(grid: Grid, start: int, goal: int, on_event=None, model: CostModel = OCTILE) -> tuple:
+    """
+    Jump Point Search.
+
+    A* for uniform-cost 8-connected grids that skips over cells rather
+    than expanding them. From each expanded cell it scans straight and
+    diagonally, only stopping at "jump points": the goal, or cells with
+    a forced neighbour that an optimal path could only reach through
+    them because a barrier sits beside the scan. Those jump points are
+    the only cells put on the frontier, so open areas are crossed in
+    one step instead of being flooded.
+
+    Moves cost 1 straight and sqrt(2) diagonally, with diagonal moves
+    allowed past corners, and the octile distance is the heuristic, so
+    the path returned is a shortest one. The pruning rules are only
+    valid for that cost model, so any other raises ValueError.
+
+    Same contract as astar_search: returns (path, stats), path being
+    every cell from start to goal or None, and reports events for the
+    jump points opened and closed and the cells on the path.
+
+    See https://harablog.wordpress.com/2011/09/07/jump-point-search/
+    """
+    if model.moves != OCTILE.moves or model.diagonal_cost != SQRT2 or model.corners != CUT_CORNERS:
+        raise ValueError(f"Jump Point Search needs octile costs with corner cutting, not {model}")
+
+    stats = SearchStats()
+    grid.ensure_masks(CUT_CORNERS)
+
+    goal_position = grid.position(goal)
+    count = 0
+    g_score = {start: 0}
+    came_from = {}
+    closed = set()
+
+    frontier = IndexedHeap()
+    frontier.push(start, (octile(grid.position(start), goal_position), count))
+
+    while not frontier.empty():
+        current_node, _ = frontier.pop()
+        closed.add(current_node)
+        stats.expanded += 1
+
+        if current_node == goal:
+            path = expand_path(grid, reconstruct_jumps(came_from, current_node))
+            if on_event:
+                for square in path[1:-1]:
+                    on_event(PATH, square)
+            stats.finish(path, g_score[goal])
+            return path, stats
+
+        position = grid.position(current_node)
+        for jump_point in successors(grid, current_node, came_from.get(current_node), goal):
+            if jump_point in closed:
+                continue
+            jump_position = grid.position(jump_point)
+            temp_g_score = g_score[current_node] + octile(position, jump_position)
+
+            if temp_g_score < g_score.get(jump_point, float("inf")):
+                came_from[jump_point] = current_node
+                g_score[jump_point] = temp_g_score
+                f_score = temp_g_score + octile(jump_position, goal_position)
+
+                if jump_point not in frontier:
+                    stats.pushed += 1
+                    if on_event and jump_point != goal:
+                        on_event(OPEN, jump_point)
+                count += 1
+                frontier.push(jump_point, (f_score, count))
+
+        stats.frontier_peak = max(stats.frontier_peak, len(frontier))
+        if on_event and current_node != start:
+            on_event(CLOSED, current_node)
+
+    stats.finish(None)
+    return None, stats
+
+
+def successors(grid: Grid, index: int, parent: int, goal: int) -> list:
+    """
+    The jump points found by scanning from a cell in each direction
+    left after pruning by the direction it was reached from.
+    """
+    mask = grid.masks[index]
+    if parent is None:
+        directions = OFFSETS
+    else:
+        row, column = grid.position(index)
+        parent_row, parent_column = grid.position(parent)
+        direction = (sign(row - parent_row), sign(column - parent_column))
+        directions = list(NATURAL[direction])
+        for neighbour_bit, obstacle_bit, neighbour in FORCED[direction]:
+            if not mask & obstacle_bit:
+                directions.append(neighbour)
+
+    jump_points = []
+    for d_row, d_column in directions:
+        if mask & BIT[(d_row, d_column)]:
+            jump_point = jump(grid, index, d_row, d_column, goal)
+            if jump_point is not None:
+                jump_points.append(jump_point)
+    return jump_points
+
+
+def jump(grid: Grid, index: int, d_row: int, d_column: int, goal: int) -> int:
+    """
+    Scans from a cell in one direction and returns the first jump
+    point, or None if the scan runs into a barrier or the edge.
+    """
+    masks = grid.masks
+    step = d_row * grid.columns + d_column
+    forward = BIT[(d_row, d_column)]
+    forced = FORCED[(d_row, d_column)]
+    diagonal = d_row and d_column
+
+    while masks[index] & forward:
+        index += step
+        if index == goal:
+            return index
+        mask = masks[index]
+        for neighbour_bit, obstacle_bit, _ in forced:
+            if mask & neighbour_bit and not mask & obstacle_bit:
+                return index
+        # A diagonal scan stops where a straight scan from it finds a jump point
+        if diagonal and (jump(grid, index, 0, d_column, goal) is not None
+                         or jump(grid, index, d_row, 0, goal) is not None):
+            return index
+    return None
+
+
+def reconstruct_jumps(came_from: dict, current_node: int) -> list:
+    """
+    The jump points from the start to the current node.
+    """
+    jump_points = [current_node]
+    while current_node in came_from:
+        current_node = came_from[current_node]
+        jump_points.append(current_node)
+    jump_points.reverse()
+    return jump_points
+
+
+def expand_path(grid: Grid, jump_points: list) -> list:
+    """
+    Fills in the cells between consecutive jump points, which always
+    lie on one straight or diagonal line.
+    """
+    path = jump_points[:1]
+    for index, target in zip(jump_points, jump_points[1:]):
+        (row, column), (target_row, target_column) = grid.position(index), grid.position(target)
+        step = sign(target_row - row) * grid.columns + sign(target_column - column)
+        while index != target:
+            index += step
+            path.append(index)
+    return path
+
+
+def sign(value: int) -> int:
+    return (value > 0) - (value < 0)
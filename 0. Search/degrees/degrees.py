@@ -1,22 +1,82 @@
+import argparse
 import csv
+import multiprocessing
+import os
+import random
 import sys
 import time
+import tracemalloc
 
-from util import Node, StackFrontier, QueueFrontier
+from util import Node
+from frontier import IndexedQueueFrontier
+from graph import Graph, path_from_tree, paths_from_dag
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+import snapshot
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# Maps person_ids to a dictionary of: name, birth
 people = {}
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# Maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# Integer-indexed co-starring graph linking people and movies
+graph = None
+
+# Optional landmark distance oracle over the graph
+landmarks = None
+
+# Sorted name index for prefix and fuzzy lookups, built on first use
+name_index = None
+
+# Number of leading journal batches already included in the snapshot
+snapshot_batches = 0
+
+# Number of journal batches replayed on top of the snapshot
+journaled_batches = 0
+
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
+
+    After the first load a binary snapshot is written next to the CSV
+    files, and later loads read it instead as long as the CSV files
+    have not changed size or modification time. Rows added with
+    ingest that the snapshot does not already include are then
+    replayed from the journal, so a lost or stale snapshot is rebuilt
+    from the CSV files plus the whole journal.
+    """
+    global graph, snapshot_batches, journaled_batches
+
+    source_fingerprint = snapshot.fingerprint(directory)
+    cached = snapshot.load(directory, source_fingerprint)
+    if cached is not None:
+        graph, cached_names, cached_people, cached_movies, snapshot_batches = cached
+        names.update(cached_names)
+        people.update(cached_people)
+        movies.update(cached_movies)
+    else:
+        graph = read_csv_files(directory)
+        snapshot_batches = 0
+        snapshot.save(directory, source_fingerprint, graph, names, people, movies)
+
+    # Replay the remaining journaled batches together, in one pass over the graph arrays
+    batches = snapshot.read_journal(directory, source_fingerprint)[snapshot_batches:]
+    if batches:
+        add_rows(*([row for batch in batches for row in batch[column]] for column in range(3)))
+    journaled_batches = len(batches)
+    if journaled_batches >= snapshot.COMPACT_AFTER:
+        compact(directory)
+
+
+def read_csv_files(directory):
+    """
+    Parses the CSV files into people, movies and names,
+    and returns the co-starring graph.
     """
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -24,8 +84,7 @@ def load_data(directory):
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
@@ -38,51 +97,256 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
 
+    person_ids = list(people)
+    movie_ids = list(movies)
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
     # Load stars
+    edges = []
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                edges.append((person_index[row["person_id"]], movie_index[row["movie_id"]]))
             except KeyError:
                 pass
 
+    return Graph.from_edges(person_ids, movie_ids, edges)
+
+
+def add_rows(new_people, new_movies, new_stars):
+    """
+    Adds [id, name, birth] people rows, [id, title, year] movie rows and
+    [person_id, movie_id] star rows to the loaded data in place.
+
+    Returns the set of person indices whose co-stars changed.
+    """
+    global name_index
+
+    added_people = []
+    for person_id, name, birth in new_people:
+        if person_id in people:
+            continue
+        people[person_id] = {"name": name, "birth": birth}
+        names.setdefault(name.lower(), set()).add(person_id)
+        added_people.append(person_id)
+    graph.add_people(added_people)
+
+    added_movies = []
+    for movie_id, title, year in new_movies:
+        if movie_id in movies:
+            continue
+        movies[movie_id] = {"title": title, "year": year}
+        added_movies.append(movie_id)
+    graph.add_movies(added_movies)
+
+    edges = []
+    for person_id, movie_id in new_stars:
+        if person_id in graph.person_index and movie_id in graph.movie_index:
+            edges.append((graph.person_index[person_id], graph.movie_index[movie_id]))
+    touched = graph.add_edges(edges)
+
+    if added_people:
+        name_index = None
+    if landmarks is not None:
+        landmarks.update(graph, touched)
+    return touched
+
+
+def ingest(directory, delta_directory):
+    """
+    Adds the rows in people.csv, movies.csv and stars.csv under
+    delta_directory (any of which may be missing) to the loaded data
+    from directory, and journals them so later loads include them.
+    Every snapshot.COMPACT_AFTER batches the snapshot is compacted.
+    If the journal cannot be written (e.g. a read-only directory) the
+    rows are only added in memory.
+
+    The landmark index, if loaded, is repaired and saved rather than
+    rebuilt. Returns the number of people whose co-stars changed.
+    """
+    global journaled_batches
+
+    def read_rows(filename, columns):
+        try:
+            with open(os.path.join(delta_directory, filename), encoding="utf-8") as f:
+                return [[row[column] for column in columns] for row in csv.DictReader(f)]
+        except FileNotFoundError:
+            return []
+
+    new_people = read_rows("people.csv", ["id", "name", "birth"])
+    new_movies = read_rows("movies.csv", ["id", "title", "year"])
+    new_stars = read_rows("stars.csv", ["person_id", "movie_id"])
+
+    touched = add_rows(new_people, new_movies, new_stars)
+    if not snapshot.append_journal(directory, snapshot.fingerprint(directory), new_people, new_movies, new_stars):
+        return len(touched)
+    journaled_batches += 1
+    if journaled_batches >= snapshot.COMPACT_AFTER:
+        compact(directory)
+
+    if landmarks is not None:
+        landmarks.save(directory, data_fingerprint(directory))
+    return len(touched)
+
+
+def compact(directory):
+    """
+    Rewrites the snapshot to include the journaled batches, so later
+    loads replay none of them. The journal itself is kept.
+    """
+    global snapshot_batches, journaled_batches
+
+    batches = snapshot_batches + journaled_batches
+    if snapshot.save(directory, snapshot.fingerprint(directory), graph, names, people, movies, batches):
+        snapshot_batches, journaled_batches = batches, 0
+
+
+def data_fingerprint(directory):
+    """
+    Identifies the loaded data: the CSV files plus the number of
+    batches ingested on top of them, whether compacted or journaled.
+    """
+    return snapshot.fingerprint(directory) + [["journal", snapshot_batches + journaled_batches]]
+
+
+def load_landmarks(directory, k):
+    """
+    Loads the landmark index for the data in directory,
+    building and saving it first if it is missing or stale.
+    """
+    global landmarks
+
+    source_fingerprint = data_fingerprint(directory)
+    landmarks = LandmarkIndex.load(directory, source_fingerprint, k, len(graph.person_ids))
+    if landmarks is None:
+        landmarks = LandmarkIndex.build(graph, k)
+        landmarks.save(directory, source_fingerprint)
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two actors.")
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="directory holding people.csv, movies.csv and stars.csv")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer every pair of names in a two-column CSV file")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write batch results to FILE instead of standard output")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="answer batch queries with N processes, 0 for one per CPU (default: 1)")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="K",
+                        help="use a precomputed index of K landmark actors to bound and prune searches")
+    parser.add_argument("--estimate", action="store_true",
+                        help="report landmark bounds on the degrees of separation instead of searching")
+    parser.add_argument("--ingest", metavar="DIR",
+                        help="add the new people, movies and stars CSV rows in DIR to the data")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="time searches between N seeded random pairs and report percentiles")
+    parser.add_argument("--seed", type=int, default=50,
+                        help="random seed for --benchmark pairs (default: 50)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record the memory high-water mark of each --benchmark search")
+    parser.add_argument("--within", type=int, metavar="N",
+                        help="count the people within N degrees of one person instead of finding a path")
+    parser.add_argument("--all-paths", type=int, metavar="LIMIT",
+                        help="list up to LIMIT different shortest paths instead of just one")
+    parser.add_argument("--lookup", metavar="NAME",
+                        help="list people matching NAME by exact, prefix or approximate match and exit")
+    args = parser.parse_args()
+    if args.estimate and not args.landmarks:
+        parser.error("--estimate requires --landmarks")
+    if args.benchmark is not None and args.benchmark < 1:
+        parser.error("--benchmark N must be at least 1")
+    if args.landmarks < 0:
+        parser.error("--landmarks K must not be negative")
+    if args.all_paths is not None and args.all_paths < 1:
+        parser.error("--all-paths LIMIT must be at least 1")
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=sys.stderr if args.batch else sys.stdout)
+    load_data(args.directory)
+    print("Data loaded.", file=sys.stderr if args.batch else sys.stdout)
+
+    if args.landmarks:
+        load_landmarks(args.directory, args.landmarks)
+
+    if args.ingest:
+        changed = ingest(args.directory, args.ingest)
+        print(f"Ingested {args.ingest}: {changed} people gained co-stars.",
+              file=sys.stderr if args.batch else sys.stdout)
+
+    if args.benchmark is not None:
+        run_benchmark(args.benchmark, args.seed, args.trace_memory)
+        return
+
+    if args.lookup:
+        for candidate in lookup_name(args.lookup):
+            print(f"ID: {candidate.person_id}, Name: {candidate.name}, Birth: {candidate.birth}, "
+                  f"Match: {candidate.match}")
+        return
+
+    if args.batch:
+        run_batch(args.batch, args.output, args.workers or os.cpu_count())
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
+
+    if args.within is not None:
+        for depth, count in enumerate(reachable_counts(source, args.within)):
+            print(f"{depth} degrees: {count} people")
+        return
+
     target = person_id_for_name(input("Name: "))
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if args.all_paths is not None:
+        paths = all_shortest_paths(source, target, args.all_paths)
+        if not paths:
+            print("Not connected.")
+        for number, path in enumerate(paths, 1):
+            print(f"Path {number}, {len(path)} degrees of separation.")
+            print_path(source, path)
+        return
+
+    if args.estimate:
+        lower, upper = estimate_degrees(source, target)
+        if lower is None:
+            print("Not connected.")
+        elif upper is None:
+            print(f"At least {lower} degrees of separation.")
+        else:
+            print(f"Between {lower} and {upper} degrees of separation.")
+        return
+
+    path = bidirectional_shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
     else:
         degrees = len(path)
         print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        print_path(source, path)
+
+
+def print_path(source, path):
+    """
+    Prints each step of a path of (movie_id, person_id) pairs from source.
+    """
+    degrees = len(path)
+    path = [(None, source)] + path
+    for i in range(degrees):
+        person1 = people[path[i][1]]["name"]
+        person2 = people[path[i + 1][1]]["name"]
+        movie = movies[path[i + 1][0]]["title"]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
 def shortest_path(source, target):
@@ -100,7 +364,7 @@ def shortest_path(source, target):
     timer = time.time()
 
     # Start with frontier and initial node
-    frontier = QueueFrontier()
+    frontier = IndexedQueueFrontier()
     initial_node = Node(state=source, parent=None, action=None)
     frontier.add(initial_node)
 
@@ -146,30 +410,275 @@ def shortest_path(source, target):
                 frontier.add(child)
 
 
+def bidirectional_shortest_path(source, target):
+    """
+    Finds the shortest path between any two actors (source, target)
+    by growing one breadth-first frontier from each end and stopping
+    as soon as the two searches meet in the middle.
+
+    Each step expands a whole level of whichever frontier is smaller,
+    so the number of states explored grows with roughly half the
+    degrees of separation instead of all of them.
+
+    When a landmark index is loaded, it prunes both searches.
+
+    Returns the same list of (movie_id, person_id) pairs as
+    shortest_path, or None if there is no possible path.
+    """
+    print(
+        f"Finding shortest path between {people[source]['name']} ({source}) and {people[target]['name']} ({target})...")
+    path, stats = search(graph.person_index[source], graph.person_index[target])
+    print(f"Explored { stats.nodes_expanded } states in { stats.seconds } seconds")
+
+    if path is None:
+        return None
+    return path_to_ids(path)
+
+
+def run_benchmark(count, seed=50, trace_memory=False):
+    """
+    Searches between count random pairs of people chosen with a fixed
+    seed, so runs on the same data are comparable, and prints the
+    percentiles of each SearchStats measurement.
+    """
+    generator = random.Random(seed)
+    pairs = [(generator.randrange(len(graph.person_ids)), generator.randrange(len(graph.person_ids)))
+             for _ in range(count)]
+
+    if trace_memory:
+        tracemalloc.start()
+    results = [search(source, target)[1] for source, target in pairs]
+    if trace_memory:
+        tracemalloc.stop()
+
+    connected = sum(stats.path_length is not None for stats in results)
+    print(f"{count} searches, {connected} connected, seed {seed}")
+    print(f"{'measure':<16}{'p50':>12}{'p90':>12}{'p99':>12}{'max':>12}")
+    measures = ["seconds", "nodes_expanded", "frontier_peak", "expansion_time"]
+    if trace_memory:
+        measures.append("memory_peak")
+    for measure in measures:
+        values = sorted(getattr(stats, measure) for stats in results)
+        if not values:
+            continue
+        row = [percentile(values, p) for p in (50, 90, 99, 100)]
+        print(f"{measure:<16}" + "".join(f"{value:>12.6g}" for value in row))
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of an already sorted list,
+    or None if it is empty.
+    """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))
+    return values[rank - 1]
+
+
+def all_shortest_paths(source, target, limit=100):
+    """
+    Returns up to limit different shortest paths between two person_ids,
+    each a list of (movie_id, person_id) pairs, or an empty list if they
+    are not connected. Paths differing only in the movie that links two
+    people count as different paths.
+    """
+    source_index, target_index = graph.person_index[source], graph.person_index[target]
+    predecessors = graph.shortest_path_dag(source_index, target_index)
+    if predecessors is None:
+        return []
+    return [path_to_ids(path) for path in paths_from_dag(predecessors, target_index, limit)]
+
+
+def people_within(person_id, n):
+    """
+    Returns a list of sets where entry d holds the person_ids exactly
+    d degrees of separation from person_id, for d up to n.
+    """
+    return [
+        {graph.person_ids[person] for person in level}
+        for level in graph.levels(graph.person_index[person_id], n)
+    ]
+
+
+def reachable_counts(person_id, n=None):
+    """
+    Returns how many people are exactly d degrees of separation from
+    person_id for each d, up to n or until everyone reachable is counted.
+    """
+    return [len(level) for level in graph.levels(graph.person_index[person_id], n)]
+
+
+def search(source, target):
+    """
+    Exact search between two person indices, returning
+    (path, stats) where stats is a graph.SearchStats.
+    """
+    return graph.bidirectional_search(source, target, landmarks)
+
+
+def estimate_degrees(source, target):
+    """
+    Returns landmark (lower, upper) bounds on the degrees of separation
+    between two person_ids without searching. See LandmarkIndex.bounds.
+    """
+    return landmarks.bounds(graph.person_index[source], graph.person_index[target])
+
+
+def answer_queries(queries, workers=1):
+    """
+    Answers many (source, target) person_id queries against the loaded graph.
+
+    Queries that share a source are answered from a single breadth-first
+    tree grown from that source, which stops once all of its targets are
+    reached. A source with only one target uses the bidirectional search.
+
+    With more than one worker the source groups are spread over a pool of
+    forked processes, which inherit the loaded graph instead of copying it.
+
+    Returns a list of paths in the same order as the queries, each a list
+    of (movie_id, person_id) pairs or None if the two are not connected.
+    """
+    targets_by_source = {}
+    for source, target in queries:
+        targets_by_source.setdefault(
+            graph.person_index[source], set()).add(graph.person_index[target])
+
+    groups = list(targets_by_source.items())
+    if workers > 1 and len(groups) > 1 and "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        chunksize = max(1, len(groups) // (workers * 4))
+        with context.Pool(workers) as pool:
+            paths_by_source = dict(pool.imap_unordered(paths_for_group, groups, chunksize))
+    else:
+        paths_by_source = dict(map(paths_for_group, groups))
+
+    results = []
+    for source, target in queries:
+        path = paths_by_source[graph.person_index[source]][graph.person_index[target]]
+        results.append(None if path is None else path_to_ids(path))
+    return results
+
+
+def paths_for_group(group):
+    """
+    Pool task answering one (source, targets) group.
+    """
+    source, targets = group
+    return source, paths_from_source(source, targets)
+
+
+def paths_from_source(source, targets):
+    """
+    Returns a dict mapping each target person index to its shortest
+    path of (movie, person) index pairs from the source index, or None.
+    """
+    if len(targets) == 1:
+        target = next(iter(targets))
+        return {target: search(source, target)[0]}
+
+    parents = graph.bfs_tree(source, targets)
+    return {target: path_from_tree(parents, target) for target in targets}
+
+
+def path_to_ids(path):
+    """
+    Converts a path of (movie, person) index pairs to (movie_id, person_id) pairs.
+    """
+    return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
+
+
+def run_batch(filename, output=None, workers=1):
+    """
+    Reads a CSV file of (source name, target name) rows, answers them all
+    and writes one CSV row per query with the degrees of separation and
+    the path as movie_id:person_id steps.
+
+    Names must match exactly one person, otherwise the row is reported
+    as not found rather than prompting for a choice.
+    """
+    with open(filename, encoding="utf-8") as f:
+        rows = [row for row in csv.reader(f) if len(row) >= 2]
+
+    resolved = [(resolve_person(row[0]), resolve_person(row[1])) for row in rows]
+    queries = [pair for pair in resolved if None not in pair]
+    answers = iter(answer_queries(queries, workers))
+
+    out = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(["source", "target", "degrees", "path"])
+        for row, pair in zip(rows, resolved):
+            if None in pair:
+                writer.writerow([row[0], row[1], "not found", ""])
+                continue
+            path = next(answers)
+            if path is None:
+                writer.writerow([row[0], row[1], "not connected", ""])
+            else:
+                steps = " ".join(f"{movie_id}:{person_id}" for movie_id, person_id in path)
+                writer.writerow([row[0], row[1], len(path), steps])
+    finally:
+        if output:
+            out.close()
+
+
+def resolve_person(name):
+    """
+    Returns the IMDB id for a person's name without prompting,
+    or None if the name is unknown or ambiguous.
+    """
+    person_ids = names.get(name.strip().lower(), set())
+    if len(person_ids) != 1:
+        return None
+    return next(iter(person_ids))
+
+
+def lookup_name(name, limit=10, max_distance=2):
+    """
+    Returns ranked Candidates (person_id, name, birth, match, distance)
+    for a name, including prefix and approximate matches.
+    """
+    global name_index
+
+    if name_index is None:
+        name_index = NameIndex(people)
+    return name_index.lookup(name, limit, max_distance)
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+    If there is no exact match, close matches are offered instead.
     """
     person_ids = list(names.get(name.lower(), set()))
+    if len(person_ids) == 1:
+        return person_ids[0]
+
     if len(person_ids) == 0:
-        return None
-    elif len(person_ids) > 1:
+        candidates = lookup_name(name)
+        if len(candidates) == 0:
+            return None
+        print(f"No exact match for '{name}'. Did you mean:")
+        for candidate in candidates:
+            print(f"ID: {candidate.person_id}, Name: {candidate.name}, Birth: {candidate.birth}")
+        person_ids = [candidate.person_id for candidate in candidates]
+    else:
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
-    else:
-        return person_ids[0]
+
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
 
 
 def neighbors_for_person(person_id):
@@ -177,11 +686,9 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index[person_id]):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
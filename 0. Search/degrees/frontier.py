@@ -0,0 +1,32 @@
+from collections import deque
+
+
+class IndexedQueueFrontier():
+    """
+    Drop-in replacement for util.QueueFrontier.
+
+    Nodes are kept in a deque so removing from the front is constant
+    time, and the states currently queued are mirrored in a set so
+    contains_state does not have to scan the whole frontier.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = set()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states.add(node.state)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.popleft()
+        self.states.discard(node.state)
+        return node
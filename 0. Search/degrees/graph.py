@@ -0,0 +1,476 @@
+import time
+import tracemalloc
+from array import array
+
+
+class SearchStats():
+    """
+    Instrumentation gathered by one search.
+
+    expansion_time is the time spent expanding frontier levels: scanning
+    the adjacency rows of each person, the visited checks and appending
+    to the next frontier, which are interleaved too finely to time apart.
+    The rest of seconds goes on choosing the side to expand and on path
+    reconstruction. memory_peak is the tracemalloc peak in bytes, and is
+    only recorded when tracemalloc is tracing.
+    """
+
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.frontier_peak = 0
+        self.expansion_time = 0.0
+        self.seconds = 0.0
+        self.memory_peak = None
+        self.path_length = None
+        self.started = time.perf_counter()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def finish(self, path):
+        """
+        Records the result and total time, and returns the path.
+        """
+        self.seconds = time.perf_counter() - self.started
+        self.path_length = None if path is None else len(path)
+        if tracemalloc.is_tracing():
+            self.memory_peak = tracemalloc.get_traced_memory()[1]
+        return path
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in vars(self).items() if name != "started")
+        return f"SearchStats({fields})"
+
+
+class Graph():
+    """
+    Co-starring graph stored as compressed sparse rows.
+
+    People and movies are mapped to dense integer indices. The movies of
+    person p are person_movies[person_offsets[p]:person_offsets[p + 1]] and
+    the stars of movie m are movie_people[movie_offsets[m]:movie_offsets[m + 1]],
+    so every edge costs one machine integer in each direction instead of
+    a string inside a Python set.
+    """
+
+    def __init__(self, person_ids, movie_ids, person_offsets, person_movies, movie_offsets, movie_people):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        self.movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edges):
+        """
+        Builds the graph from lists of person and movie IDs and an
+        iterable of (person_index, movie_index) star edges.
+        Duplicate edges are dropped.
+        """
+        number_of_movies = len(movie_ids)
+
+        # Sorting the encoded edges groups them by person, which is exactly
+        # the order of the person -> movie rows, and makes duplicates adjacent.
+        encoded = sorted(person * number_of_movies + movie for person, movie in edges)
+
+        person_offsets = array("i", [0]) * (len(person_ids) + 1)
+        person_movies = array("i")
+        movie_counts = array("i", [0]) * number_of_movies
+        previous = -1
+        for code in encoded:
+            if code == previous:
+                continue
+            previous = code
+            person, movie = divmod(code, number_of_movies)
+            person_offsets[person + 1] += 1
+            person_movies.append(movie)
+            movie_counts[movie] += 1
+
+        for person in range(len(person_ids)):
+            person_offsets[person + 1] += person_offsets[person]
+
+        movie_offsets = array("i", [0]) * (number_of_movies + 1)
+        for movie in range(number_of_movies):
+            movie_offsets[movie + 1] = movie_offsets[movie] + movie_counts[movie]
+
+        # Fill movie -> person rows, reusing movie_counts as the write cursor
+        movie_people = array("i", [0]) * len(person_movies)
+        for movie in range(number_of_movies):
+            movie_counts[movie] = movie_offsets[movie]
+        for person in range(len(person_ids)):
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                movie_people[movie_counts[movie]] = person
+                movie_counts[movie] += 1
+
+        return cls(person_ids, movie_ids, person_offsets, person_movies, movie_offsets, movie_people)
+
+    def add_people(self, person_ids):
+        """
+        Appends new person IDs, which start with no movies.
+        """
+        for person_id in person_ids:
+            self.person_index[person_id] = len(self.person_ids)
+            self.person_ids.append(person_id)
+
+    def add_movies(self, movie_ids):
+        """
+        Appends new movie IDs, which start with no stars.
+        """
+        for movie_id in movie_ids:
+            self.movie_index[movie_id] = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+
+    def add_edges(self, edges):
+        """
+        Adds (person_index, movie_index) star edges in place, skipping
+        ones already present.
+
+        The new entries are spliced into the existing rows with bulk
+        array copies, so the cost is one pass over the arrays rather than
+        a rebuild from scratch. Returns the set of person indices whose
+        co-stars changed: the new stars and everyone already in their movies.
+        """
+        person_additions = {}
+        for person, movie in edges:
+            row = person_additions.setdefault(person, [])
+            if movie in row:
+                continue
+            if person + 1 < len(self.person_offsets) and movie in self.movies_for_person(person):
+                continue
+            row.append(movie)
+
+        movie_additions = {}
+        touched = set()
+        for person, row in person_additions.items():
+            for movie in row:
+                if movie + 1 < len(self.movie_offsets):
+                    touched.update(self.stars_for_movie(movie))
+                movie_additions.setdefault(movie, []).append(person)
+                touched.add(person)
+
+        self.person_offsets, self.person_movies = insert_rows(
+            self.person_offsets, self.person_movies, person_additions, len(self.person_ids))
+        self.movie_offsets, self.movie_people = insert_rows(
+            self.movie_offsets, self.movie_people, movie_additions, len(self.movie_ids))
+        return touched
+
+    def movies_for_person(self, person):
+        """
+        Returns the movie indices a person index starred in.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_for_movie(self, movie):
+        """
+        Returns the person indices that starred in a movie index.
+        """
+        return self.movie_people[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with a given person index, including the person themself.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_people[j]
+
+    def bidirectional_search(self, source, target, landmarks=None):
+        """
+        Breadth-first search from both the source and target person
+        indices, always expanding a whole level of the smaller frontier.
+
+        Given a LandmarkIndex, a person first reached at depth d from one
+        end is not expanded if d plus their landmark lower bound to the
+        other end exceeds the landmark upper bound on the whole distance,
+        as no shortest path can run through them.
+
+        Returns (path, stats) where path is a list of (movie, person)
+        index pairs from source to target, or None if the two people are
+        not connected, and stats is a SearchStats.
+        """
+        stats = SearchStats()
+        if source == target:
+            return stats.finish([]), stats
+
+        upper = None
+        if landmarks is not None:
+            lower, upper = landmarks.bounds(source, target)
+            if lower is None:
+                return stats.finish(None), stats
+
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        clock = time.perf_counter
+
+        # Each side maps a person to the (person, movie) it was reached from
+        source_parents = {source: None}
+        target_parents = {target: None}
+        source_frontier = [source]
+        target_frontier = [target]
+        source_depth = target_depth = 0
+
+        # Each side's landmark distances, paired with the distance to its far end
+        if upper is not None:
+            source_ends = [(distances, distances[target]) for distances in landmarks.distances]
+            target_ends = [(distances, distances[source]) for distances in landmarks.distances]
+
+        while source_frontier and target_frontier:
+            stats.frontier_peak = max(stats.frontier_peak, len(source_frontier) + len(target_frontier))
+            expand_source = len(source_frontier) <= len(target_frontier)
+            if expand_source:
+                frontier, parents, other_parents = source_frontier, source_parents, target_parents
+                source_depth += 1
+                depth = source_depth
+                if upper is not None:
+                    ends = source_ends
+            else:
+                frontier, parents, other_parents = target_frontier, target_parents, source_parents
+                target_depth += 1
+                depth = target_depth
+                if upper is not None:
+                    ends = target_ends
+
+            next_frontier = []
+            expansion_started = clock()
+            for person in frontier:
+                stats.nodes_expanded += 1
+                for i in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        neighbor = movie_people[j]
+                        if neighbor in parents:
+                            continue
+                        parents[neighbor] = (person, movie)
+                        if neighbor in other_parents:
+                            stats.expansion_time += clock() - expansion_started
+                            path = join_paths(neighbor, source_parents, target_parents)
+                            return stats.finish(path), stats
+
+                        if upper is not None:
+                            # Admissible estimate of the remaining degrees
+                            estimate = 0
+                            for distances, end_distance in ends:
+                                difference = abs(distances[neighbor] - end_distance)
+                                if difference > estimate:
+                                    estimate = difference
+                            if depth + estimate > upper:
+                                continue
+                        next_frontier.append(neighbor)
+            stats.expansion_time += clock() - expansion_started
+
+            if expand_source:
+                source_frontier = next_frontier
+            else:
+                target_frontier = next_frontier
+
+        return stats.finish(None), stats
+
+    def levels(self, source, max_depth=None):
+        """
+        Level-synchronous expansion outward from a source person index.
+
+        Yields an array of the person indices first reached at each depth,
+        starting with [source] at depth 0, up to max_depth if given.
+        Visited people and movies are tracked in byte-per-index bitmaps,
+        and each movie's stars are scanned only once.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        seen_people = bytearray(len(self.person_ids))
+        seen_movies = bytearray(len(self.movie_ids))
+        seen_people[source] = 1
+        frontier = array("i", [source])
+        depth = 0
+
+        while frontier:
+            yield frontier
+            if max_depth is not None and depth >= max_depth:
+                return
+            depth += 1
+            next_frontier = array("i")
+            for person in frontier:
+                for i in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        neighbor = movie_people[j]
+                        if not seen_people[neighbor]:
+                            seen_people[neighbor] = 1
+                            next_frontier.append(neighbor)
+            frontier = next_frontier
+
+    def shortest_path_dag(self, source, target):
+        """
+        Breadth-first search from source that records every shortest-path
+        predecessor instead of only the first one.
+
+        Returns a dict mapping each person reached, up to the target's
+        level, to a list of the (person, movie) pairs one step closer to
+        the source, or None if the target is not connected.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        depths = {source: 0}
+        predecessors = {source: []}
+        frontier = [source]
+        depth = 0
+
+        while frontier and target not in depths:
+            depth += 1
+            next_frontier = []
+            for person in frontier:
+                for i in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        neighbor = movie_people[j]
+                        neighbor_depth = depths.get(neighbor)
+                        if neighbor_depth is None:
+                            depths[neighbor] = depth
+                            predecessors[neighbor] = [(person, movie)]
+                            next_frontier.append(neighbor)
+                        elif neighbor_depth == depth:
+                            predecessors[neighbor].append((person, movie))
+            frontier = next_frontier
+
+        return predecessors if target in depths else None
+
+    def bfs_tree(self, source, targets=None):
+        """
+        Breadth-first search outward from a source person index.
+
+        Returns a dict mapping every person reached to the (person, movie)
+        it was first reached from, with the source mapped to None. If a
+        collection of target indices is given the search stops as soon as
+        all of them have been reached.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        parents = {source: None}
+        remaining = None if targets is None else set(targets) - {source}
+        if remaining is not None and not remaining:
+            return parents
+
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for person in frontier:
+                for i in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        neighbor = movie_people[j]
+                        if neighbor in parents:
+                            continue
+                        parents[neighbor] = (person, movie)
+                        next_frontier.append(neighbor)
+                        if remaining is not None:
+                            remaining.discard(neighbor)
+                            if not remaining:
+                                return parents
+            frontier = next_frontier
+
+        return parents
+
+
+def insert_rows(offsets, values, additions, size):
+    """
+    Returns new (offsets, values) CSR arrays with size rows, where
+    additions maps row numbers to lists of values appended to that row.
+    Rows past the end of the old offsets start out empty.
+    """
+    new_offsets = array("i", offsets)
+    new_offsets.extend(array("i", [new_offsets[-1]]) * (size + 1 - len(new_offsets)))
+    new_values = array("i")
+    values = memoryview(values).cast("B").cast("i")
+
+    rows = sorted(additions)
+    copied = 0
+    shift = 0
+    for k, row in enumerate(rows):
+        # Offsets at and after row + 1 have not been shifted yet
+        end = new_offsets[row + 1]
+        new_values.frombytes(values[copied:end].cast("B"))
+        new_values.extend(additions[row])
+        copied = end
+        shift += len(additions[row])
+        next_row = rows[k + 1] if k + 1 < len(rows) else size
+        for i in range(row + 1, next_row + 1):
+            new_offsets[i] += shift
+    new_values.frombytes(values[copied:].cast("B"))
+
+    return new_offsets, new_values
+
+
+def path_from_tree(parents, target):
+    """
+    Returns the list of (movie, person) pairs from the root of a
+    bfs_tree to the target, or None if the target was not reached.
+    """
+    if target not in parents:
+        return None
+    path = []
+    person = target
+    while parents[person] is not None:
+        parent, movie = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
+
+
+def paths_from_dag(predecessors, target, limit=None):
+    """
+    Returns up to limit distinct paths of (movie, person) pairs from the
+    root of a shortest_path_dag to the target, walking predecessors back
+    from the target so no search is repeated.
+    """
+    paths = []
+    suffix = []
+
+    def walk(person):
+        if not predecessors[person]:
+            paths.append(suffix[::-1])
+            return limit is not None and len(paths) >= limit
+        for parent, movie in predecessors[person]:
+            suffix.append((movie, person))
+            done = walk(parent)
+            suffix.pop()
+            if done:
+                return True
+        return False
+
+    if limit is None or limit > 0:
+        walk(target)
+    return paths
+
+
+def join_paths(meeting, source_parents, target_parents):
+    """
+    Builds the list of (movie, person) pairs from the source to
+    the target through the person where both searches met.
+    """
+    path = []
+    person = meeting
+    while source_parents[person] is not None:
+        parent, movie = source_parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    person = meeting
+    while target_parents[person] is not None:
+        following, movie = target_parents[person]
+        path.append((movie, following))
+        person = following
+
+    return path
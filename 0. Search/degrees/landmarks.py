@@ -0,0 +1,157 @@
+"""
+Landmark distance oracle for the degrees graph.
+
+A handful of well-connected people are chosen as landmarks and the
+breadth-first distance from each of them to every person is stored.
+By the triangle inequality, for any landmark L:
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+so the degrees of separation between two people can be bracketed with
+a few array lookups, and the lower bound is an admissible estimate that
+Graph.bidirectional_search uses to prune people who cannot lie on a
+shortest path.
+"""
+
+import json
+import os
+from array import array
+from collections import deque
+
+LANDMARKS_VERSION = 1
+LANDMARKS_FILENAME = "degrees.landmarks"
+UNREACHABLE = -1
+
+
+class LandmarkIndex():
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k):
+        """
+        Picks the k people with the most co-star edges as landmarks
+        and runs a breadth-first search from each of them.
+        """
+        person_offsets, person_movies = graph.person_offsets, graph.person_movies
+        movie_offsets = graph.movie_offsets
+
+        degree = []
+        for person in range(len(graph.person_ids)):
+            degree.append(sum(
+                movie_offsets[movie + 1] - movie_offsets[movie]
+                for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]))
+        order = sorted(range(len(degree)), key=degree.__getitem__, reverse=True)
+        landmarks = order[:k]
+
+        return cls(landmarks, [distances_from(graph, landmark) for landmark in landmarks])
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two person indices. upper is None when no landmark reaches both,
+        and lower is None when they are known to be disconnected.
+        """
+        lower, upper = 0, None
+        for distances in self.distances:
+            source_distance, target_distance = distances[source], distances[target]
+            if source_distance == UNREACHABLE and target_distance == UNREACHABLE:
+                continue
+            if source_distance == UNREACHABLE or target_distance == UNREACHABLE:
+                return None, None
+            lower = max(lower, abs(source_distance - target_distance))
+            if upper is None or source_distance + target_distance < upper:
+                upper = source_distance + target_distance
+        return lower, upper
+
+    def update(self, graph, touched):
+        """
+        Repairs the stored distances after edges were added to the graph.
+
+        Adding edges can only shorten distances, so each landmark's
+        distances are relaxed outward from the touched people and nothing
+        outside the region that actually got closer is visited.
+        """
+        for distances in self.distances:
+            distances.extend(array("h", [UNREACHABLE]) * (len(graph.person_ids) - len(distances)))
+
+            queue = deque(person for person in touched if distances[person] != UNREACHABLE)
+            while queue:
+                person = queue.popleft()
+                depth = distances[person] + 1
+                for _, neighbor in graph.neighbors(person):
+                    if distances[neighbor] == UNREACHABLE or distances[neighbor] > depth:
+                        distances[neighbor] = depth
+                        queue.append(neighbor)
+
+    def save(self, directory, source_fingerprint):
+        """
+        Writes the index next to the data files, keyed on the same
+        fingerprint as the snapshot so it goes stale with the CSVs.
+        """
+        header = json.dumps({
+            "version": LANDMARKS_VERSION,
+            "fingerprint": source_fingerprint,
+            "landmarks": self.landmarks
+        }).encode("utf-8")
+        path = os.path.join(directory, LANDMARKS_FILENAME)
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(len(header).to_bytes(8, "little"))
+                f.write(header)
+                for distances in self.distances:
+                    distances.tofile(f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    @classmethod
+    def load(cls, directory, source_fingerprint, k, number_of_people):
+        """
+        Returns the saved index if it matches the data and k, otherwise None.
+        """
+        try:
+            with open(os.path.join(directory, LANDMARKS_FILENAME), "rb") as f:
+                header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+                if (header.get("version") != LANDMARKS_VERSION
+                        or header.get("fingerprint") != source_fingerprint
+                        or len(header.get("landmarks", [])) != k):
+                    return None
+                distances = []
+                for _ in header["landmarks"]:
+                    values = array("h")
+                    values.fromfile(f, number_of_people)
+                    distances.append(values)
+        except (OSError, ValueError, EOFError):
+            return None
+        return cls(header["landmarks"], distances)
+
+
+def distances_from(graph, source):
+    """
+    Returns an array of breadth-first distances from a person index
+    to every person, with UNREACHABLE for other components.
+    """
+    person_offsets, person_movies = graph.person_offsets, graph.person_movies
+    movie_offsets, movie_people = graph.movie_offsets, graph.movie_people
+
+    distances = array("h", [UNREACHABLE]) * len(graph.person_ids)
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for person in frontier:
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[i]
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    neighbor = movie_people[j]
+                    if distances[neighbor] == UNREACHABLE:
+                        distances[neighbor] = depth
+                        next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances
+
@@ -0,0 +1,127 @@
+"""
+Name lookup index for the degrees dataset.
+
+Lowercased names are kept in one sorted list, so every name starting
+with a prefix is a contiguous slice found by binary search. The sorted
+list is also walked as an implicit trie for bounded edit-distance
+searches: each shared prefix extends one row of the Levenshtein table,
+and a branch is abandoned as soon as its row exceeds the bound, so a
+typo only visits the few prefixes that could still match.
+"""
+
+import heapq
+from bisect import bisect_left
+from collections import namedtuple
+
+# match is one of "exact", "prefix" or "fuzzy"; distance is the edit distance
+Candidate = namedtuple("Candidate", ["person_id", "name", "birth", "match", "distance"])
+
+MATCH_RANK = {"exact": 0, "prefix": 1, "fuzzy": 2}
+
+
+class NameIndex():
+
+    def __init__(self, people):
+        entries = sorted((person["name"].lower(), person_id) for person_id, person in people.items())
+        self.people = people
+        self.keys = [key for key, _ in entries]
+        self.person_ids = [person_id for _, person_id in entries]
+
+    def exact(self, name):
+        """
+        Returns the positions of names equal to name.
+        """
+        name = name.lower()
+        start = bisect_left(self.keys, name)
+        end = start
+        while end < len(self.keys) and self.keys[end] == name:
+            end += 1
+        return range(start, end)
+
+    def prefix(self, prefix):
+        """
+        Returns the positions of names starting with prefix.
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        # Every name with the prefix sorts before prefix followed by the highest code point
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        return range(start, end)
+
+    def fuzzy(self, name, max_distance):
+        """
+        Returns (position, distance) for names within max_distance edits of name.
+        """
+        name = name.lower()
+        keys = self.keys
+        cap = max_distance + 1
+        matches = []
+        # (prefix, start, end, row): keys[start:end] all start with prefix, and
+        # row[j] is the edit distance between prefix and name[:j], capped
+        stack = [("", 0, len(keys), [min(j, cap) for j in range(len(name) + 1)])]
+        while stack:
+            prefix, start, end, row = stack.pop()
+            depth = len(prefix)
+            # Names equal to the prefix sort first in its range
+            while start < end and len(keys[start]) == depth:
+                if row[-1] <= max_distance:
+                    matches.append((start, row[-1]))
+                start += 1
+            while start < end:
+                char = keys[start][depth]
+                child = prefix + char
+                child_end = bisect_left(keys, child + "\U0010ffff", start, end)
+                # Only cells within max_distance of the diagonal can stay in
+                # bound, so the rest of the row is left at the cap
+                i = depth + 1
+                low, high = max(1, i - max_distance), min(len(name), i + max_distance)
+                child_row = [cap] * (len(name) + 1)
+                if i <= max_distance:
+                    child_row[0] = i
+                for j in range(low, high + 1):
+                    child_row[j] = min(
+                        row[j] + 1,
+                        child_row[j - 1] + 1,
+                        row[j - 1] + (name[j - 1] != char),
+                        cap)
+                if min(child_row[low - 1:high + 1], default=cap) <= max_distance:
+                    stack.append((child, start, child_end, child_row))
+                start = child_end
+        return matches
+
+    def prefix_rank(self, position):
+        key = self.keys[position]
+        return len(key), key, self.people[self.person_ids[position]]["birth"]
+
+    def lookup(self, name, limit=10, max_distance=2):
+        """
+        Returns up to limit Candidates for a typed name, ranked exact
+        matches first, then names starting with it, then names within
+        max_distance edits, each group ordered by name and birth year.
+        The fuzzy search is skipped when the first two groups fill limit.
+        """
+        name = name.strip()
+        found = {}
+        for position in self.exact(name):
+            found[position] = ("exact", 0)
+        if len(found) < limit:
+            # Only the names ranked first can make the cut
+            prefixed = heapq.nsmallest(
+                limit - len(found),
+                (position for position in self.prefix(name) if position not in found),
+                key=self.prefix_rank)
+            for position in prefixed:
+                found[position] = ("prefix", len(self.keys[position]) - len(name))
+        if len(found) < limit:
+            for position, distance in self.fuzzy(name, max_distance):
+                found.setdefault(position, ("fuzzy", distance))
+
+        candidates = []
+        for position, (match, distance) in found.items():
+            person_id = self.person_ids[position]
+            person = self.people[person_id]
+            candidates.append(Candidate(person_id, person["name"], person["birth"], match, distance))
+        candidates.sort(key=lambda c: (MATCH_RANK[c.match], c.distance, c.name.lower(), c.birth))
+        return candidates[:limit]
+
+
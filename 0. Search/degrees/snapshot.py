@@ -0,0 +1,205 @@
+"""
+Binary snapshot cache for the degrees dataset.
+
+A snapshot file holds the CSR arrays of the co-starring graph followed
+by a pickled table of names, people and movies. It is keyed on the
+size and modification time of the source CSV files, so any edit to
+them makes the snapshot stale and it is rebuilt on the next load.
+
+Rows ingested after loading are appended to a journal file under the
+same fingerprint. The journal is the durable record of every ingested
+batch and is only left behind when the CSV files change, so the
+snapshot stays a disposable cache. To keep loads fast, once
+COMPACT_AFTER batches are journaled beyond the snapshot it is rewritten
+to include them, and records how many leading journal batches it holds
+so only the rest are replayed.
+
+Layout:
+    MAGIC | header length (8 bytes) | JSON header | padding | arrays | tables
+"""
+
+import json
+import mmap
+import os
+import pickle
+import sys
+from array import array
+
+from graph import Graph
+
+MAGIC = b"DEGSNAP\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILENAME = "degrees.snapshot"
+JOURNAL_FILENAME = "degrees.journal"
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people")
+ALIGNMENT = 8
+COMPACT_AFTER = 8
+
+
+def fingerprint(directory):
+    """
+    Returns the [name, size, mtime] of each source CSV file,
+    used to decide whether a snapshot is still current.
+    """
+    result = []
+    for filename in SOURCE_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        result.append([filename, stat.st_size, stat.st_mtime_ns])
+    return result
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_FILENAME)
+
+
+def save(directory, source_fingerprint, graph, names, people, movies, batches=0):
+    """
+    Writes a snapshot of the loaded data next to the CSV files,
+    batches being the number of leading journal batches it includes.
+    Failing to write (e.g. a read-only directory) is not an error,
+    the data simply gets parsed again next time.
+
+    Returns whether the snapshot was written.
+    """
+    arrays = [getattr(graph, name) for name in ARRAYS]
+    tables = pickle.dumps(
+        (graph.person_ids, graph.movie_ids, names, people, movies),
+        protocol=pickle.HIGHEST_PROTOCOL)
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": source_fingerprint,
+        "byteorder": sys.byteorder,
+        "itemsize": arrays[0].itemsize,
+        "lengths": [len(values) for values in arrays],
+        "tables": len(tables),
+        "batches": batches
+    }
+    encoded_header = json.dumps(header).encode("utf-8")
+    prefix_length = len(MAGIC) + 8 + len(encoded_header)
+    padding = -prefix_length % ALIGNMENT
+
+    path = snapshot_path(directory)
+    temporary_path = path + ".tmp"
+    try:
+        with open(temporary_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(encoded_header).to_bytes(8, "little"))
+            f.write(encoded_header)
+            f.write(b"\0" * padding)
+            # Arrays may still be memory-mapped views of the old snapshot
+            for values in arrays:
+                f.write(values)
+            f.write(tables)
+        os.replace(temporary_path, path)
+    except OSError:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def load(directory, source_fingerprint):
+    """
+    Loads a snapshot if one exists for the current CSV files.
+
+    Returns (graph, names, people, movies, batches), or None if the
+    snapshot is missing, stale, truncated, corrupt, or was written by
+    another version or platform, in which case it is rebuilt.
+    The graph arrays are memory-mapped views of the file.
+    """
+    try:
+        with open(snapshot_path(directory), "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if mapping[:len(MAGIC)] != MAGIC:
+        return None
+    header_start = len(MAGIC) + 8
+    header_length = int.from_bytes(mapping[len(MAGIC):header_start], "little")
+    try:
+        header = json.loads(mapping[header_start:header_start + header_length])
+    except ValueError:
+        return None
+
+    if (not isinstance(header, dict)
+            or header.get("version") != SNAPSHOT_VERSION
+            or header.get("fingerprint") != source_fingerprint
+            or header.get("byteorder") != sys.byteorder
+            or header.get("itemsize") != array("i").itemsize):
+        return None
+
+    # The arrays and tables must fill the rest of the file exactly
+    lengths, tables_length = header.get("lengths"), header.get("tables")
+    if (not isinstance(lengths, list) or len(lengths) != len(ARRAYS)
+            or not all(isinstance(length, int) and length >= 0 for length in lengths)
+            or not isinstance(tables_length, int) or tables_length < 0):
+        return None
+    itemsize = header["itemsize"]
+    position = header_start + header_length
+    position += -position % ALIGNMENT
+    if position + sum(lengths) * itemsize + tables_length != len(mapping):
+        return None
+
+    view = memoryview(mapping)
+    arrays = []
+    for length in lengths:
+        end = position + length * itemsize
+        arrays.append(view[position:end].cast("i"))
+        position = end
+
+    try:
+        person_ids, movie_ids, names, people, movies = pickle.loads(view[position:])
+    except (pickle.UnpicklingError, EOFError, TypeError, ValueError):
+        return None
+    if (len(arrays[0]) != len(person_ids) + 1 or len(arrays[2]) != len(movie_ids) + 1
+            or len(arrays[1]) != len(arrays[3])):
+        return None
+    graph = Graph(person_ids, movie_ids, *arrays)
+    return graph, names, people, movies, header.get("batches", 0)
+
+
+def append_journal(directory, source_fingerprint, new_people, new_movies, new_stars):
+    """
+    Appends one batch of ingested rows to the journal as a JSON line.
+    As with save, failing to write is not an error; returns whether
+    the batch was journaled.
+    """
+    entry = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": source_fingerprint,
+        "people": new_people,
+        "movies": new_movies,
+        "stars": new_stars
+    }
+    try:
+        with open(os.path.join(directory, JOURNAL_FILENAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError:
+        return False
+    return True
+
+
+def read_journal(directory, source_fingerprint):
+    """
+    Returns the (people, movies, stars) row batches journaled on top
+    of the current CSV files, in the order they were ingested.
+    """
+    batches = []
+    try:
+        with open(os.path.join(directory, JOURNAL_FILENAME), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if (entry.get("version") == SNAPSHOT_VERSION
+                        and entry.get("fingerprint") == source_fingerprint):
+                    batches.append((entry["people"], entry["movies"], entry["stars"]))
+    except OSError:
+        pass
+    return batches
@@ -0,0 +1,134 @@
+"""
+Tic Tac Toe engine benchmark
+
+Runs headless (pygame is never imported) and reports:
+
+    * perft: the number of move sequences from the empty board to each
+      depth, which checks move generation and win detection against the
+      known totals of the game tree
+    * nodes visited by a cold minimax search per position, and nodes/second
+    * self-play games where every move is chosen at random among the
+      optimal moves, checking that perfect play never changes the result
+
+Usage: python benchmark.py [--games N] [--seed S]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import bitboard
+import mnk
+import tictactoe as ttt
+
+# Move sequences from the empty board to each depth, stopping at wins
+PERFT = [1, 9, 72, 504, 3024, 15120, 54720, 148176, 200448, 127872]
+
+# (rows, columns, k, depth) searches for the m,n,k engine
+MNK_SEARCHES = [(4, 4, 3, 8), (4, 4, 4, 6), (5, 5, 4, 5), (6, 6, 4, 4)]
+
+
+def perft(x: int, o: int, depth: int) -> int:
+    """
+    Counts the move sequences of exactly depth plies from a position.
+    """
+    if depth == 0:
+        return 1
+    if bitboard.WINS[x] or bitboard.WINS[o]:
+        return 0
+    x_moves = bitboard.x_to_move(x, o)
+    total = 0
+    empty = bitboard.FULL & ~(x | o)
+    while empty:
+        move = empty & -empty
+        empty ^= move
+        total += perft(x | move, o, depth - 1) if x_moves else perft(x, o | move, depth - 1)
+    return total
+
+
+def positions() -> list:
+    """
+    The empty board and every distinct position after the first move.
+    """
+    return [(0, 0)] + [(1 << cell, 0) for cell in (0, 1, 4)]
+
+
+def measure_minimax():
+    """
+    Prints the nodes visited by a cold search of each position,
+    clearing the transposition table first, and nodes/second.
+    """
+    print(f"{'position':<20}{'nodes':>10}{'seconds':>12}{'nodes/s':>14}")
+    for x, o in positions():
+        bitboard.transpositions.clear()
+        bitboard.nodes = 0
+        started = time.perf_counter()
+        bitboard.best_move(x, o)
+        seconds = time.perf_counter() - started
+        print(f"{f'x={x:09b} o={o:09b}':<20}{bitboard.nodes:>10}{seconds:>12.6f}"
+              f"{bitboard.nodes / seconds:>14.0f}")
+
+    for rows, columns, k, depth in MNK_SEARCHES:
+        searcher = mnk.Searcher(mnk.Game(rows, columns, k))
+        started = time.perf_counter()
+        searcher.best_move(0, 0, max_depth=depth)
+        seconds = time.perf_counter() - started
+        print(f"{f'{rows}x{columns} k={k} d={depth}':<20}{searcher.nodes:>10}{seconds:>12.6f}"
+              f"{searcher.nodes / seconds:>14.0f}")
+
+
+def self_play(games: int, seed: int) -> dict:
+    """
+    Plays games from the empty board with both sides choosing randomly
+    among optimal moves, returning a count of the winners.
+    """
+    generator = random.Random(seed)
+    results = {ttt.X: 0, ttt.O: 0, None: 0}
+    for _ in range(games):
+        x = o = 0
+        while True:
+            moves = bitboard.optimal_moves(x, o)
+            if not moves:
+                break
+            move = 1 << generator.choice(moves)
+            if bitboard.x_to_move(x, o):
+                x |= move
+            else:
+                o |= move
+        winner = ttt.X if bitboard.WINS[x] else ttt.O if bitboard.WINS[o] else None
+        results[winner] += 1
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Tic Tac Toe engines.")
+    parser.add_argument("--games", type=int, default=5000, help="self-play games (default: 5000)")
+    parser.add_argument("--seed", type=int, default=0, help="self-play random seed (default: 0)")
+    args = parser.parse_args()
+    failed = False
+
+    print("perft")
+    for depth, expected in enumerate(PERFT):
+        count = perft(0, 0, depth)
+        status = "ok" if count == expected else f"expected {expected}"
+        failed |= count != expected
+        print(f"  depth {depth}: {count} {status}")
+
+    print("minimax")
+    measure_minimax()
+
+    print("self-play")
+    started = time.perf_counter()
+    results = self_play(args.games, args.seed)
+    seconds = time.perf_counter() - started
+    print(f"  {args.games} games in {seconds:.3f} seconds: "
+          f"{results[None]} draws, {results[ttt.X]} X wins, {results[ttt.O]} O wins")
+    failed |= results[None] != args.games
+
+    if failed:
+        sys.exit("Benchmark checks failed")
+
+
+if __name__ == "__main__":
+    main()
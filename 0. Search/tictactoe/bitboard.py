@@ -0,0 +1,173 @@
+"""
+Bitboard Tic Tac Toe engine
+
+Cells are numbered 0 to 8 row by row, so cell (i, j) is bit 3 * i + j.
+A position is a pair of 9-bit integers, one for X's marks and one for O's.
+Solved values are memoized in a transposition table keyed by the position
+with the smallest key among its 8 rotations and reflections.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100                # diagonals
+]
+
+
+def symmetries() -> list:
+    """
+    Returns the 8 rotations and reflections of the square,
+    each as a list mapping a cell to its transformed cell.
+    """
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (j, 2 - i),
+        lambda i, j: (2 - i, 2 - j),
+        lambda i, j: (2 - j, i),
+        lambda i, j: (i, 2 - j),
+        lambda i, j: (2 - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (2 - j, 2 - i)
+    ]
+    mappings = []
+    for transform in transforms:
+        mapping = []
+        for cell in range(9):
+            i, j = transform(*divmod(cell, 3))
+            mapping.append(3 * i + j)
+        mappings.append(mapping)
+    return mappings
+
+
+def permutation_table(mapping: list) -> list:
+    """
+    Returns a table giving, for every 9-bit set of marks,
+    the marks moved to their cells under mapping.
+    """
+    table = []
+    for bits in range(1 << 9):
+        moved = 0
+        for cell in range(9):
+            if bits >> cell & 1:
+                moved |= 1 << mapping[cell]
+        table.append(moved)
+    return table
+
+
+# WINS[bits] is 1 if the marks in bits complete any line
+WINS = bytearray(any(bits & line == line for line in LINES) for bits in range(1 << 9))
+
+# PERMUTED[s][bits] is bits with every cell moved by symmetry s
+PERMUTED = [permutation_table(mapping) for mapping in symmetries()]
+
+# Transposition table from canonical key to value for X: 1, 0 or -1
+transpositions = {}
+
+# Number of positions value has been called on, for benchmarking
+nodes = 0
+
+
+def from_board(board: list) -> tuple:
+    """
+    Returns the (x, o) bitboards for a nested list board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, tile in enumerate(row):
+            if tile == X:
+                x |= 1 << (3 * i + j)
+            elif tile == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def canonical(x: int, o: int) -> int:
+    """
+    Returns the smallest x | o << 9 key over the symmetries of a position.
+    """
+    return min(table[x] | table[o] << 9 for table in PERMUTED)
+
+
+def x_to_move(x: int, o: int) -> bool:
+    return bin(x).count("1") == bin(o).count("1")
+
+
+def value(x: int, o: int) -> int:
+    """
+    Returns the minimax value of a position for X with perfect play:
+    1 if X wins, -1 if O wins, 0 for a tie.
+    """
+    global nodes
+    nodes += 1
+
+    if WINS[x]:
+        return 1
+    if WINS[o]:
+        return -1
+    if x | o == FULL:
+        return 0
+
+    key = canonical(x, o)
+    cached = transpositions.get(key)
+    if cached is not None:
+        return cached
+
+    empty = FULL & ~(x | o)
+    if x_to_move(x, o):
+        best = -1
+        while empty and best < 1:
+            move = empty & -empty
+            empty ^= move
+            best = max(best, value(x | move, o))
+    else:
+        best = 1
+        while empty and best > -1:
+            move = empty & -empty
+            empty ^= move
+            best = min(best, value(x, o | move))
+
+    transpositions[key] = best
+    return best
+
+
+def optimal_moves(x: int, o: int) -> list:
+    """
+    Returns every cell that keeps the best achievable value for the
+    player to move, lowest numbered first, or [] if the game is over.
+    """
+    if WINS[x] or WINS[o] or x | o == FULL:
+        return []
+
+    maximizing = x_to_move(x, o)
+    values = {}
+    for cell in range(9):
+        move = 1 << cell
+        if (x | o) & move:
+            continue
+        values[cell] = value(x | move, o) if maximizing else value(x, o | move)
+    best = max(values.values()) if maximizing else min(values.values())
+    return [cell for cell, move_value in values.items() if move_value == best]
+
+
+def best_move(x: int, o: int) -> int:
+    """
+    Returns the lowest numbered cell among the optimal moves
+    for the player to move, or None if the game is over.
+    """
+    moves = optimal_moves(x, o)
+    return moves[0] if moves else None
+
+
+def minimax(board: list) -> tuple:
+    """
+    Returns the optimal action (i, j) for the current player on a 3x3
+    nested list board, or None if the game is over.
+    """
+    cell = best_move(*from_board(board))
+    return None if cell is None else divmod(cell, 3)
@@ -0,0 +1,136 @@
+"""
+Tic Tac Toe opening book
+
+Every position reachable from the empty board is solved once and its
+optimal move is stored in book.bin, which minimax consults before
+searching. Run this file to rebuild the book, or with --check to verify
+the current search against it.
+
+File layout: MAGIC, entry count (4 bytes), sorted position keys
+(x | o << 9, 4 bytes each), then one byte per entry holding the optimal
+cell (0 to 8) in the low nibble and the position's value for X plus one
+in the high nibble.
+"""
+
+import os
+import sys
+from array import array
+from bisect import bisect_left
+
+import bitboard
+
+MAGIC = b"TTTBOOK1"
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Loaded (keys, entries) arrays, or False once a load has failed
+book = None
+
+
+def reachable_positions() -> list:
+    """
+    Returns the (x, o) bitboards of every non-terminal position
+    reachable from the empty board, in no particular order.
+    """
+    seen = set()
+    stack = [(0, 0)]
+    while stack:
+        x, o = stack.pop()
+        if (x, o) in seen or bitboard.WINS[x] or bitboard.WINS[o] or x | o == bitboard.FULL:
+            continue
+        seen.add((x, o))
+        empty = bitboard.FULL & ~(x | o)
+        x_moves = bitboard.x_to_move(x, o)
+        for cell in range(9):
+            move = 1 << cell
+            if empty & move:
+                stack.append((x | move, o) if x_moves else (x, o | move))
+    return list(seen)
+
+
+def build(path: str = BOOK_PATH) -> int:
+    """
+    Solves every reachable position and writes the book.
+    Returns the number of positions stored.
+    """
+    keys = array("I")
+    entries = array("B")
+    for x, o in sorted(reachable_positions(), key=lambda position: position[0] | position[1] << 9):
+        keys.append(x | o << 9)
+        entries.append(bitboard.best_move(x, o) | (bitboard.value(x, o) + 1) << 4)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(keys).to_bytes(4, "little"))
+        keys.tofile(f)
+        entries.tofile(f)
+    return len(keys)
+
+
+def load(path: str = BOOK_PATH):
+    """
+    Returns the (keys, entries) arrays of the book, or None if it is
+    missing or unreadable.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            count = int.from_bytes(f.read(4), "little")
+            keys = array("I")
+            keys.fromfile(f, count)
+            entries = array("B")
+            entries.fromfile(f, count)
+    except (OSError, EOFError):
+        return None
+    if sys.byteorder != "little":
+        keys.byteswap()
+    return keys, entries
+
+
+def lookup(x: int, o: int):
+    """
+    Returns (cell, value) for a position from the book, or None if the
+    book is unavailable or does not contain the position.
+    """
+    global book
+
+    if book is None:
+        book = load() or False
+    if not book:
+        return None
+
+    keys, entries = book
+    key = x | o << 9
+    index = bisect_left(keys, key)
+    if index == len(keys) or keys[index] != key:
+        return None
+    return entries[index] & 0xF, (entries[index] >> 4) - 1
+
+
+def check() -> int:
+    """
+    Uses the book as a regression oracle: the search must agree with
+    every stored position value, and its chosen move must keep that value.
+    Returns the number of disagreeing positions.
+    """
+    failures = 0
+    for x, o in reachable_positions():
+        _, expected = lookup(x, o)
+        cell = bitboard.best_move(x, o)
+        move = 1 << cell
+        after = (x | move, o) if bitboard.x_to_move(x, o) else (x, o | move)
+        if bitboard.value(x, o) != expected or bitboard.value(*after) != expected:
+            failures += 1
+    return failures
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--check":
+        if load() is None:
+            sys.exit(f"No book at {BOOK_PATH}")
+        failures = check()
+        if failures:
+            sys.exit(f"{failures} positions disagree with the book")
+        print("Search agrees with every position in the book")
+        sys.exit(0)
+    print(f"Stored {build()} positions in {BOOK_PATH}")
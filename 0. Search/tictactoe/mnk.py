@@ -0,0 +1,449 @@
+"""
+m,n,k-game engine
+
+Generalises Tic Tac Toe to an m x n board where k marks in a row win.
+Positions are bitboards over m * n bits (cell (i, j) is bit i * n + j)
+and are searched with alpha-beta negamax under iterative deepening,
+so a move is always ready when the time budget runs out.
+
+Move ordering tries the transposition table's best move first, then
+cells lying on the most winning lines. At the depth limit positions are
+scored by counting the lines still open to each player.
+"""
+
+import atexit
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+X = "X"
+O = "O"
+
+WIN = 1000000
+# Values beyond FORCED are forced results: WIN less the plies to the win
+FORCED = WIN - 1000
+INFINITY = float("inf")
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Transposition tables are cleared once they reach this many entries
+MAX_TRANSPOSITIONS = 1 << 20
+
+
+class Timeout(Exception):
+    pass
+
+
+def to_table(value, ply: int):
+    """
+    Makes a forced result count plies from the position at ply rather
+    than from the search root, so a transposition table entry still
+    holds when it is probed from another root or ply.
+    """
+    if value > FORCED:
+        return value + ply
+    if value < -FORCED:
+        return value - ply
+    return value
+
+
+def from_table(value, ply: int):
+    """
+    Inverse of to_table for an entry probed at ply.
+    """
+    if value > FORCED:
+        return value - ply
+    if value < -FORCED:
+        return value + ply
+    return value
+
+
+def proven(value, depth: int) -> bool:
+    """
+    Whether a root value from a search to depth is a forced result that
+    deeper searches cannot change. Entries kept from earlier searches can
+    report a result further off than depth, which is only a bound: a
+    quicker win or loss may lie just beyond the horizon.
+    """
+    return abs(value) > FORCED and WIN - abs(value) <= depth
+
+
+class Game():
+    """
+    Winning lines and move ordering for one board size and k.
+    """
+
+    def __init__(self, rows: int, columns: int, k: int):
+        if k > max(rows, columns):
+            raise ValueError(f"No line of {k} fits on a {rows}x{columns} board")
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.full = (1 << (rows * columns)) - 1
+
+        self.lines = []
+        for i in range(rows):
+            for j in range(columns):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < columns:
+                        line = 0
+                        for step in range(k):
+                            line |= 1 << ((i + di * step) * columns + j + dj * step)
+                        self.lines.append(line)
+
+        self.lines_through = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(rows * columns)
+        ]
+        self.order = sorted(range(rows * columns), key=lambda cell: -len(self.lines_through[cell]))
+
+        # Score for having n of your marks on an otherwise open line
+        self.weights = [0] + [10 ** n for n in range(k)]
+
+    def from_board(self, board: list) -> tuple:
+        """
+        Returns the (x, o) bitboards for a nested list board.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, tile in enumerate(row):
+                if tile == X:
+                    x |= 1 << (i * self.columns + j)
+                elif tile == O:
+                    o |= 1 << (i * self.columns + j)
+        return x, o
+
+    def is_win(self, bits: int, cell: int) -> bool:
+        """
+        Returns True if bits complete a line through cell.
+        """
+        return any(bits & line == line for line in self.lines_through[cell])
+
+    def has_win(self, bits: int) -> bool:
+        return any(bits & line == line for line in self.lines)
+
+    def evaluate(self, me: int, opponent: int) -> int:
+        """
+        Heuristic score for the player to move: lines only they can
+        still complete count for them, weighted by marks already placed.
+        """
+        weights = self.weights
+        score = 0
+        for line in self.lines:
+            mine, theirs = me & line, opponent & line
+            if mine and not theirs:
+                score += weights[bin(mine).count("1")]
+            elif theirs and not mine:
+                score -= weights[bin(theirs).count("1")]
+        return score
+
+
+class Searcher():
+    """
+    Iterative deepening alpha-beta search with a transposition table
+    that is kept between moves of the same game geometry.
+    """
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.transpositions = {}
+        self.nodes = 0
+        self.deadline = INFINITY
+
+    def prepare(self, deadline: float):
+        """
+        Resets the per-search state, keeping the transposition table
+        unless it has grown too large.
+        """
+        if len(self.transpositions) > MAX_TRANSPOSITIONS:
+            self.transpositions.clear()
+        self.nodes = 0
+        self.deadline = deadline
+
+    def best_move(self, x: int, o: int, time_budget: float = None, max_depth: int = None):
+        """
+        Returns (cell, value, depth) for the player to move, where value is
+        from that player's point of view and depth is the deepest completed
+        iteration. Returns None if the game is already over.
+        """
+        game = self.game
+        if game.has_win(x) or game.has_win(o) or x | o == game.full:
+            return None
+
+        x_moves = bin(x).count("1") == bin(o).count("1")
+        me, opponent = (x, o) if x_moves else (o, x)
+        remaining = bin(game.full & ~(x | o)).count("1")
+        if max_depth is not None:
+            remaining = min(remaining, max_depth)
+
+        self.prepare(INFINITY if time_budget is None else time.perf_counter() + time_budget)
+        best = (self.ordered_moves(me | opponent, None)[0], 0, 0)
+        for depth in range(1, remaining + 1):
+            try:
+                value, cell = self.root(me, opponent, depth)
+            except Timeout:
+                break
+            best = (cell, value, depth)
+            if proven(value, depth):
+                break
+        return best
+
+    def root(self, me: int, opponent: int, depth: int) -> tuple:
+        """
+        Searches every root move to depth and returns (value, cell).
+        """
+        alpha, beta = -INFINITY, INFINITY
+        entry = self.transpositions.get((me, opponent))
+        best_value, best_cell = -INFINITY, None
+        for cell in self.ordered_moves(me | opponent, entry[3] if entry else None):
+            value = self.child_value(me, opponent, cell, depth, alpha, beta, 0)
+            if value > best_value:
+                best_value, best_cell = value, cell
+            alpha = max(alpha, value)
+        self.transpositions[(me, opponent)] = (depth, best_value, EXACT, best_cell)
+        return best_value, best_cell
+
+    def child_value(self, me: int, opponent: int, cell: int, depth: int, alpha, beta, ply: int):
+        """
+        Value for the player to move of playing cell.
+        """
+        placed = me | 1 << cell
+        if self.game.is_win(placed, cell):
+            return WIN - ply
+        return -self.negamax(opponent, placed, depth - 1, -beta, -alpha, ply + 1)
+
+    def negamax(self, me: int, opponent: int, depth: int, alpha, beta, ply: int):
+        """
+        Alpha-beta value of a position for the player to move (me),
+        whose opponent has just moved without winning.
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise Timeout()
+
+        game = self.game
+        if me | opponent == game.full:
+            return 0
+        if depth == 0:
+            return game.evaluate(me, opponent)
+
+        key = (me, opponent)
+        entry = self.transpositions.get(key)
+        hint = None
+        if entry is not None:
+            entry_depth, entry_value, flag, hint = entry
+            entry_value = from_table(entry_value, ply)
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return entry_value
+                if flag == LOWER:
+                    alpha = max(alpha, entry_value)
+                elif flag == UPPER:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    return entry_value
+
+        original_alpha = alpha
+        best_value, best_cell = -INFINITY, None
+        for cell in self.ordered_moves(me | opponent, hint):
+            value = self.child_value(me, opponent, cell, depth, alpha, beta, ply)
+            if value > best_value:
+                best_value, best_cell = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transpositions[key] = (depth, to_table(best_value, ply), flag, best_cell)
+        return best_value
+
+    def ordered_moves(self, occupied: int, hint) -> list:
+        """
+        Empty cells, the hinted move first and then by number of lines.
+        """
+        moves = [cell for cell in self.game.order if not occupied >> cell & 1]
+        if hint is not None and hint in moves:
+            moves.remove(hint)
+            moves.insert(0, hint)
+        return moves
+
+
+class ParallelSearcher():
+    """
+    Root-split alpha-beta over a process pool.
+
+    Following young brothers wait, the first ordered root move is searched
+    here to establish a bound, then the remaining root moves are searched
+    in parallel. Workers share the best root value found so far and search
+    each move with a window just below it, so moves that cannot beat it
+    fail low quickly while ties are still resolved exactly, and the chosen
+    move is the first best move in the same order as the serial search.
+
+    One search at a time per ParallelSearcher, since the bound is shared.
+    """
+
+    def __init__(self, game: Game, workers: int = None):
+        self.game = game
+        context = multiprocessing.get_context()
+        self.bound = context.Value("d", -INFINITY)
+        self.pool = ProcessPoolExecutor(workers, mp_context=context,
+                                        initializer=init_worker, initargs=(self.bound,))
+        self.hint = None
+        # Searches the eldest root move here, keeping its transpositions
+        self.searcher = Searcher(game)
+
+    def close(self):
+        self.pool.shutdown()
+
+    def best_move(self, x: int, o: int, time_budget: float = None, max_depth: int = None):
+        """
+        Same contract as Searcher.best_move, deepening one full
+        parallel root search at a time.
+        """
+        game = self.game
+        if game.has_win(x) or game.has_win(o) or x | o == game.full:
+            return None
+
+        x_moves = bin(x).count("1") == bin(o).count("1")
+        me, opponent = (x, o) if x_moves else (o, x)
+        remaining = bin(game.full & ~(x | o)).count("1")
+        if max_depth is not None:
+            remaining = min(remaining, max_depth)
+
+        deadline = INFINITY if time_budget is None else time.perf_counter() + time_budget
+        self.hint = None
+        best = (self.ordered_moves(me | opponent)[0], 0, 0)
+        for depth in range(1, remaining + 1):
+            try:
+                value, cell = self.root(me, opponent, depth, deadline)
+            except Timeout:
+                break
+            best = (cell, value, depth)
+            self.hint = cell
+            if proven(value, depth):
+                break
+        return best
+
+    def root(self, me: int, opponent: int, depth: int, deadline: float) -> tuple:
+        """
+        Searches every root move to depth and returns (value, cell),
+        raising Timeout if the deadline passes first.
+        """
+        moves = self.ordered_moves(me | opponent)
+
+        eldest = self.searcher
+        eldest.prepare(deadline)
+        values = {moves[0]: eldest.child_value(me, opponent, moves[0], depth, -INFINITY, INFINITY, 0)}
+        self.bound.value = values[moves[0]]
+
+        geometry = (self.game.rows, self.game.columns, self.game.k)
+        tasks = [(geometry, me, opponent, cell, depth, deadline - time.perf_counter())
+                 for cell in moves[1:]]
+        for cell, value in self.pool.map(search_root_move, tasks):
+            if value is None:
+                raise Timeout()
+            values[cell] = value
+
+        best_value = max(values.values())
+        return best_value, next(cell for cell in moves if values[cell] == best_value)
+
+    def ordered_moves(self, occupied: int) -> list:
+        moves = [cell for cell in self.game.order if not occupied >> cell & 1]
+        if self.hint in moves:
+            moves.remove(self.hint)
+            moves.insert(0, self.hint)
+        return moves
+
+
+# Best root value shared by the workers of a ParallelSearcher's pool
+shared_bound = None
+
+
+def init_worker(bound):
+    global shared_bound
+    shared_bound = bound
+
+
+def search_root_move(task: tuple) -> tuple:
+    """
+    Pool task searching one root move. Returns (cell, value), where value
+    is None if the time budget ran out, and raises the shared bound.
+    """
+    (rows, columns, k), me, opponent, cell, depth, seconds_left = task
+    # The worker's own searcher, so transpositions and move ordering carry
+    # over between root moves and deepening iterations
+    searcher = searcher_for(rows, columns, k)
+    searcher.prepare(time.perf_counter() + seconds_left)
+
+    # Values are integers, so searching just below the bound keeps ties exact
+    bound = shared_bound.value
+    try:
+        value = searcher.child_value(me, opponent, cell, depth, bound - 1, INFINITY, 0)
+    except Timeout:
+        return cell, None
+
+    with shared_bound.get_lock():
+        if value > shared_bound.value:
+            shared_bound.value = value
+    return cell, value
+
+
+# One searcher per (rows, columns, k), so transpositions carry over between moves
+searchers = {}
+
+
+def searcher_for(rows: int, columns: int, k: int) -> Searcher:
+    key = (rows, columns, k)
+    if key not in searchers:
+        searchers[key] = Searcher(Game(rows, columns, k))
+    return searchers[key]
+
+
+# Parallel searchers by (rows, columns, k), each owning a process pool,
+# oldest first. At most MAX_PARALLEL_SEARCHERS pools are kept alive.
+parallel_searchers = {}
+MAX_PARALLEL_SEARCHERS = 2
+
+
+def parallel_searcher_for(rows: int, columns: int, k: int, workers: int = None) -> ParallelSearcher:
+    key = (rows, columns, k)
+    if key not in parallel_searchers:
+        while len(parallel_searchers) >= MAX_PARALLEL_SEARCHERS:
+            oldest = next(iter(parallel_searchers))
+            parallel_searchers.pop(oldest).close()
+        parallel_searchers[key] = ParallelSearcher(Game(rows, columns, k), workers)
+    return parallel_searchers[key]
+
+
+def close_parallel_searchers():
+    """
+    Shuts down the process pools of every cached ParallelSearcher.
+    """
+    while parallel_searchers:
+        parallel_searchers.popitem()[1].close()
+
+
+atexit.register(close_parallel_searchers)
+
+
+def minimax(board: list, k: int, time_budget: float = None, max_depth: int = None,
+            workers: int = 1) -> tuple:
+    """
+    Returns the best action (i, j) found for the current player on an
+    m x n nested list board within the time budget, or None if the game
+    is over. With more than one worker the root moves are searched in
+    parallel by a ParallelSearcher.
+    """
+    if workers > 1:
+        searcher = parallel_searcher_for(len(board), len(board[0]), k, workers)
+    else:
+        searcher = searcher_for(len(board), len(board[0]), k)
+    found = searcher.best_move(*searcher.game.from_board(board), time_budget, max_depth)
+    if found is None:
+        return None
+    return divmod(found[0], searcher.game.columns)
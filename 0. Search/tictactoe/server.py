@@ -0,0 +1,183 @@
+"""
+Headless Tic Tac Toe server
+
+Hosts many concurrent games over a line protocol on a local TCP socket.
+The event loop only parses commands and updates boards; AI moves run in
+a process pool, so a slow search never blocks other players.
+
+Commands, one per line, answered with one line each:
+
+    NEW [X|O] [ROWS COLUMNS K]   start a game playing as X (default) or O
+                                 -> GAME <id> <board> <status>
+    MOVE <id> <i> <j>            play a move, the AI replies in the same answer
+                                 -> GAME <id> <board> <status>
+    SHOW <id>                    -> GAME <id> <board> <status>
+    END <id>                     forget a game -> OK
+    QUIT                         close the connection
+
+Boards are rows joined by "/" with X, O or "." per tile. Status is
+"TURN X" or "TURN O" while playing, then "WIN X", "WIN O" or "TIE".
+Errors are answered with "ERROR <message>".
+
+Usage: python server.py [--host HOST] [--port PORT] [--workers N]
+"""
+
+import argparse
+import asyncio
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+
+
+class GameSession():
+    """
+    One game: the board, the human's mark, and a lock so moves
+    arriving together for the same game are applied in order.
+    """
+
+    def __init__(self, user: str, rows: int, columns: int, k: int):
+        self.user = user
+        self.k = k
+        self.board = ttt.initial_state(rows, columns, k)
+        self.lock = asyncio.Lock()
+
+    def over(self) -> bool:
+        return ttt.terminal(self.board, self.k)
+
+    def describe(self) -> str:
+        board = "/".join("".join(tile or "." for tile in row) for row in self.board)
+        if self.over():
+            winner = ttt.winner(self.board, self.k)
+            status = f"WIN {winner}" if winner else "TIE"
+        else:
+            status = f"TURN {ttt.player(self.board)}"
+        return f"{board} {status}"
+
+
+class GameServer():
+
+    def __init__(self, workers: int = None, time_budget: float = ttt.TIME_BUDGET):
+        self.games = {}
+        self.ids = itertools.count(1)
+        self.pool = ProcessPoolExecutor(workers)
+        self.time_budget = time_budget
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode("utf-8", "replace").split()
+                if words and words[0].upper() == "QUIT":
+                    break
+                try:
+                    reply = await self.dispatch(words)
+                except ValueError as error:
+                    reply = f"ERROR {error}"
+                writer.write((reply + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, words: list) -> str:
+        if not words:
+            raise ValueError("empty command")
+        command, arguments = words[0].upper(), words[1:]
+        if command == "NEW":
+            return await self.new_game(arguments)
+        if command == "MOVE":
+            return await self.move(arguments)
+        if command == "SHOW":
+            game_id, game = self.find(arguments)
+            return f"GAME {game_id} {game.describe()}"
+        if command == "END":
+            game_id, _ = self.find(arguments)
+            del self.games[game_id]
+            return "OK"
+        raise ValueError(f"unknown command {command}")
+
+    def find(self, arguments: list) -> tuple:
+        try:
+            game_id = int(arguments[0])
+            return game_id, self.games[game_id]
+        except (IndexError, ValueError, KeyError):
+            raise ValueError("no such game")
+
+    async def new_game(self, arguments: list) -> str:
+        user = ttt.X
+        if arguments and arguments[0].upper() in (ttt.X, ttt.O):
+            user = arguments.pop(0).upper()
+        rows, columns, k = 3, 3, 3
+        if arguments:
+            try:
+                rows, columns, k = (int(argument) for argument in arguments)
+            except ValueError:
+                raise ValueError("size must be ROWS COLUMNS K")
+            if not (rows >= 1 and columns >= 1 and 1 <= k <= max(rows, columns) and rows * columns <= 100):
+                raise ValueError("unsupported board size")
+
+        game_id = next(self.ids)
+        game = GameSession(user, rows, columns, k)
+        self.games[game_id] = game
+        async with game.lock:
+            await self.ai_move(game)
+        return f"GAME {game_id} {game.describe()}"
+
+    async def move(self, arguments: list) -> str:
+        game_id, game = self.find(arguments)
+        try:
+            action = (int(arguments[1]), int(arguments[2]))
+        except (IndexError, ValueError):
+            raise ValueError("usage: MOVE <id> <i> <j>")
+
+        async with game.lock:
+            if game.over() or ttt.player(game.board) != game.user:
+                raise ValueError("not your turn")
+            try:
+                game.board = ttt.result(game.board, action)
+            except Exception:
+                raise ValueError("invalid move")
+            await self.ai_move(game)
+        return f"GAME {game_id} {game.describe()}"
+
+    async def ai_move(self, game: GameSession):
+        """
+        Plays the computer's move if it is its turn, searching in the pool.
+        """
+        if game.over() or ttt.player(game.board) == game.user:
+            return
+        loop = asyncio.get_running_loop()
+        action = await loop.run_in_executor(
+            self.pool, ttt.minimax, game.board, game.k, self.time_budget)
+        game.board = ttt.result(game.board, action)
+
+
+async def serve(host: str, port: int, workers: int, time_budget: float):
+    game_server = GameServer(workers, time_budget)
+    server = await asyncio.start_server(game_server.handle_connection, host, port)
+    print(f"Serving Tic Tac Toe on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Tic Tac Toe server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes searching AI moves (default: one per CPU)")
+    parser.add_argument("--time-budget", type=float, default=ttt.TIME_BUDGET,
+                        help="seconds per AI move on boards larger than 3x3")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.time_budget))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -5,18 +5,45 @@ Tic Tac Toe Player
 import math
 import copy
 
+import bitboard
+import book
+import mnk
+
 X = "X"
 O = "O"
 EMPTY = None
 
+# Seconds minimax may spend on a move for boards larger than 3x3
+TIME_BUDGET = 1.0
+
 
-def initial_state() -> list:
+class State(list):
     """
-    Returns starting state of the board.
+    A board (list of rows) that also carries its move count, last move
+    and winner for k in a row. result keeps these up to date by only
+    checking the lines through the last move, so player, winner and
+    terminal never need to rescan the board during a game. The search
+    engines work on their own bitboards and do not use these.
+    Plain nested lists are still accepted everywhere a board is.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+
+    def __init__(self, rows: list, k: int = 3, move_count: int = 0,
+                 last_move: tuple = None, game_winner: str = None):
+        super().__init__(rows)
+        self.k = k
+        self.move_count = move_count
+        self.last_move = last_move
+        self.game_winner = game_winner
+
+    def is_full(self) -> bool:
+        return self.move_count == len(self) * len(self[0])
+
+
+def initial_state(rows: int = 3, columns: int = 3, k: int = 3) -> list:
+    """
+    Returns starting state of the board, 3x3 unless another size is given.
+    """
+    return State([[EMPTY] * columns for _ in range(rows)], k)
 
 
 def player(board: list) -> str:
@@ -25,8 +52,11 @@ def player(board: list) -> str:
     In the initial game state, X gets the first move. 
     Subsequently, the player alternates with each additional move.
     """
-    count_of_empty = sum(row.count(EMPTY) for row in board)
-    if count_of_empty % 2 == 0:
+    if isinstance(board, State):
+        return X if board.move_count % 2 == 0 else O
+    count_of_x = sum(row.count(X) for row in board)
+    count_of_o = sum(row.count(O) for row in board)
+    if count_of_x > count_of_o:
         return "O"
     else:
         return "X"
@@ -35,7 +65,7 @@ def player(board: list) -> str:
 def actions(board: list) -> set:
     """
     Returns set of all possible actions (i, j) available on the board.
-    i corresponds to the row of the move (0, 1, or 2).
+    i corresponds to the row of the move (0, 1, or 2 on a 3x3 board).
     j corresponds to which cell/tile in the row corresponds to the move (also 0, 1, or 2).
     Possible moves are any cells on the board that do not already have an X or an O in them.
     """
@@ -54,10 +84,18 @@ def actions(board: list) -> set:
 def result(board: list, action: tuple) -> list:
     """
     Returns the board that results from making move (i, j) on the board.
+    A State board results in a State with the winner updated from the
+    lines through (i, j) alone.
     """
     i, j = action
-    if i < 3 and j < 3 and board[i][j] is EMPTY:
+    if 0 <= i < len(board) and 0 <= j < len(board[i]) and board[i][j] is EMPTY:
         current_player = player(board)
+        if isinstance(board, State):
+            new_board = State([list(row) for row in board], board.k, board.move_count + 1, action)
+            new_board[i][j] = current_player
+            # A game already won stays won whatever is played after
+            new_board.game_winner = board.game_winner or check_last_move(new_board, action, board.k)
+            return new_board
         new_board = copy.deepcopy(board)
         new_board[i][j] = current_player
         # print(new_board)
@@ -66,78 +104,115 @@ def result(board: list, action: tuple) -> list:
         raise Exception("Action invalid!")
 
 
-def winner(board: list) -> str:
+def board_k(board: list, k: int = None) -> int:
+    """
+    Returns k if given, else the State's own k, else 3.
+    """
+    return k if k is not None else getattr(board, "k", 3)
+
+
+def winner(board: list, k: int = None) -> str:
     """
     Returns the winner of the game, if there is one.
+    A player wins with k of their marks in a row, by default the
+    board's own k for a State and 3 otherwise.
     If the game is a tie or in progress, should return None.
     Implements A/B pruning to avoid unneeded checks.
     """
-    if check_horizontal(board) != None:
-        return check_horizontal(board)
-    elif check_vertical(board) != None:
-        return check_vertical(board)
-    elif check_diagonal(board) != None:
-        return check_diagonal(board)
+    k = board_k(board, k)
+    if isinstance(board, State) and board.k == k:
+        return board.game_winner
+    if check_horizontal(board, k) != None:
+        return check_horizontal(board, k)
+    elif check_vertical(board, k) != None:
+        return check_vertical(board, k)
+    elif check_diagonal(board, k) != None:
+        return check_diagonal(board, k)
     elif len(actions(board)) == 0:
         return None
     else:
         return None
 
 
-def check_horizontal(board: list) -> str:
+def check_last_move(board: list, action: tuple, k: int = 3) -> str:
     """
-    Checks board horizontal lines for winner
-    Returns the winner if there is one.
+    Checks only the row, column and diagonals through the tile at action
+    Returns the player there if they now have k in a row.
     """
-    for row in board:
-        if row.count(X) == 3:
-            return X
-        elif row.count(O) == 3:
-            return O
-
+    i, j = action
+    mark = board[i][j]
+    rows, columns = len(board), len(board[0])
+    for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+        count = 1
+        for sign in (1, -1):
+            row, column = i + sign * di, j + sign * dj
+            while 0 <= row < rows and 0 <= column < columns and board[row][column] == mark:
+                count += 1
+                row, column = row + sign * di, column + sign * dj
+        if count >= k:
+            return mark
     return None
 
 
-def check_vertical(board: list) -> str:
+def check_lines(lines: list, k: int) -> str:
     """
-    Checks board vertical lines for winner
+    Checks every run of k consecutive tiles along each line
     Returns the winner if there is one.
     """
-    for i in range(len(board)):
-        column = [board[0][i], board[1][i], board[2][i]]
-        if column.count(X) == 3:
-            return X
-        elif column.count(O) == 3:
-            return O
+    for line in lines:
+        for start in range(len(line) - k + 1):
+            run = line[start:start + k]
+            if run.count(X) == k:
+                return X
+            elif run.count(O) == k:
+                return O
 
     return None
 
 
-def check_diagonal(board: list) -> str:
+def check_horizontal(board: list, k: int = 3) -> str:
     """
-    Checks board diagonal lines for winner
+    Checks board horizontal lines for winner
     Returns the winner if there is one.
     """
-    diagonal_one = [board[0][0], board[1][1], board[2][2]]
-    diagonal_two = [board[0][2], board[1][1], board[2][0]]
+    return check_lines(board, k)
 
-    if diagonal_one.count(X) == 3 or diagonal_two.count(X) == 3:
-        return X
-    elif diagonal_one.count(O) == 3 or diagonal_two.count(O) == 3:
-        return O
-    else:
-        return None
+
+def check_vertical(board: list, k: int = 3) -> str:
+    """
+    Checks board vertical lines for winner
+    Returns the winner if there is one.
+    """
+    columns = [[row[j] for row in board] for j in range(len(board[0]))]
+    return check_lines(columns, k)
 
 
-def terminal(board: list) -> bool:
+def check_diagonal(board: list, k: int = 3) -> str:
+    """
+    Checks board diagonal lines in both directions for winner
+    Returns the winner if there is one.
+    """
+    rows, columns = len(board), len(board[0])
+    diagonals = []
+    for offset in range(-(rows - 1), columns):
+        diagonals.append([board[i][i + offset] for i in range(rows) if 0 <= i + offset < columns])
+        diagonals.append([board[i][columns - 1 - i - offset] for i in range(rows)
+                          if 0 <= columns - 1 - i - offset < columns])
+    return check_lines(diagonals, k)
+
+
+def terminal(board: list, k: int = None) -> bool:
     """
     Returns True if game is over, False otherwise.
     """
-    game_won, no_more_moves = winner(board) != None, len(actions(board)) is 0
+    k = board_k(board, k)
+    if isinstance(board, State) and board.k == k:
+        return board.game_winner is not None or board.is_full()
+    game_won, no_more_moves = winner(board, k) != None, len(actions(board)) is 0
     return True if game_won or no_more_moves else False
 
 
-def utility(board: list) -> int:
+def utility(board: list, k: int = None) -> int:
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
@@ -147,67 +222,29 @@ def utility(board: list) -> int:
         O: -1
     }
 
-    evaluator = winner(board)
+    evaluator = winner(board, k)
     return utility.get(evaluator)
 
 
-def minimax(board: list) -> tuple:
+def minimax(board: list, k: int = None, time_budget: float = TIME_BUDGET, workers: int = 1) -> tuple:
     """
     Returns the optimal action for the current player on the board.
     The move returned should be the optimal action (i, j) that is one of the allowable actions on the board. 
-    Both players start with your worst score. If player is Max (X), its score is -infinity. 
-    Else if player is Min (O), its score is +infinity.
-    """
-    if terminal(board):
+    The move comes from the precomputed opening book when it is available,
+    otherwise from the bitboard engine, which memoizes solved positions
+    in a transposition table shared by every call.
+    Boards other than 3x3 with 3 in a row are searched by the m,n,k engine
+    with iterative deepening alpha-beta, and return the best move found
+    within time_budget seconds, splitting root moves across that many
+    worker processes if workers is more than 1.
+    k defaults to the State's own k, or 3 for a plain board.
+    """
+    k = board_k(board, k)
+    if terminal(board, k):
         return None
-    Max = float('-inf')
-    Min = float('inf')
-
-    if player(board) is X:
-        return max_value(board, Max, Min)[1]
-    else:
-        return min_value(board, Max, Min)[1]
-
-
-def max_value(board: list, Max: float, Min: float) -> tuple:
-    """
-    Returns the value and optimal action (v, a) that gives X (max) player maximum score.
-    Starts with worst value of -infinity and wants a 1 for a win.
-    """
-    if terminal(board):
-        return [utility(board), None]
-
-    best_move = None
-    value = float('-inf')
-    possible_actions = actions(board)
-    for action in possible_actions:
-        new_board_state = result(board, action)
-        move_value = min_value(new_board_state, Max, Min)[0]
-        Max = max(Max, move_value)
-        if move_value > value:
-            value, best_move = move_value, action
-        if Max >= Min:
-            break
-    return tuple([value, best_move])
-
-
-def min_value(board: list, Max: float, Min: float) -> tuple:
-    """
-    Returns the value and optimal action (v, a) that gives O (min) player minimum score.
-    Starts with worst value of +infinity and wants a -1 for a win.
-    """
-    if terminal(board):
-        return [utility(board), None]
-
-    best_move = None
-    value = float('inf')
-    possible_actions = actions(board)
-    for action in possible_actions:
-        new_board_state = result(board, action)
-        move_value = max_value(new_board_state, Max, Min)[0]
-        Min = min(Min, move_value)
-        if move_value < value:
-            value, best_move = move_value, action
-        if Max >= Min:
-            break
-    return tuple([value, best_move])
+    if len(board) != 3 or len(board[0]) != 3 or k != 3:
+        return mnk.minimax(board, k, time_budget, workers=workers)
+    entry = book.lookup(*bitboard.from_board(board))
+    if entry is not None:
+        return divmod(entry[0], 3)
+    return bitboard.minimax(board)